@@ -1,120 +1,207 @@
 
-import os
+import time
+import asyncio
+import hashlib
 import logging
-from datetime import datetime, timedelta
+from datetime import timedelta
+from typing import Optional, Tuple
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
-from bot.models import PlanType, PLAN_CONFIGS
-from bot.utils import format_btc_amount, format_currency, format_username, calculate_percentage
+from bot.models import PLAN_CFG_BY_STR
+from bot.btc_api import invalidate_balance
+from bot.utils import (
+    format_btc_amount, format_currency, format_username, calculate_percentage, escape_md, utc_now,
+    ttl_cached, invalidate_cached
+)
+from bot.core.config import Config
 import database
 
 logger = logging.getLogger(__name__)
 
+# Fixed-width row of the All Users table
+_USERS_ROW_FMT = "{:<8} {:<12} {:<6} {:<10} {:<12}\n"
+
+# Static keyboards are built once at import time
+ADMIN_MAIN_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("👥 All Users", callback_data="admin_users")],
+    [InlineKeyboardButton("💰 Total Profits", callback_data="admin_profits")],
+    [InlineKeyboardButton("⏳ Pending Transactions", callback_data="admin_pending")],
+    [InlineKeyboardButton("📊 Statistics", callback_data="admin_stats")],
+    [InlineKeyboardButton("🔧 Force Actions", callback_data="admin_force")],
+    [InlineKeyboardButton("🔔 Alerts", callback_data="admin_alerts")],
+    [InlineKeyboardButton("🗄 Pool Stats", callback_data="admin_pool_stats")],
+    [InlineKeyboardButton("⬅ Back to Bot", callback_data="back_to_main")]
+])
+
+USERS_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("🔄 Refresh", callback_data="admin_users")],
+    [InlineKeyboardButton("⬅ Back", callback_data="admin_back")]
+])
+
+PROFITS_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("🔄 Refresh", callback_data="admin_profits")],
+    [InlineKeyboardButton("♻️ Force Refresh", callback_data="admin_profits:force")],
+    [InlineKeyboardButton("📊 Plan Breakdown", callback_data="admin_plan_breakdown")],
+    [InlineKeyboardButton("⬅ Back", callback_data="admin_back")]
+])
+
+PENDING_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("🔄 Refresh", callback_data="admin_pending")],
+    [InlineKeyboardButton("🔧 Force Actions", callback_data="admin_force")],
+    [InlineKeyboardButton("⬅ Back", callback_data="admin_back")]
+])
+
+STATS_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("🔄 Refresh", callback_data="admin_stats")],
+    [InlineKeyboardButton("♻️ Force Refresh", callback_data="admin_stats:force")],
+    [InlineKeyboardButton("⬅ Back", callback_data="admin_back")]
+])
+
+PLAN_BREAKDOWN_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("🔄 Refresh", callback_data="admin_plan_breakdown")],
+    [InlineKeyboardButton("♻️ Force Refresh", callback_data="admin_plan_breakdown:force")],
+    [InlineKeyboardButton("⬅ Back", callback_data="admin_profits")]
+])
+
+ALERTS_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("🔄 Refresh", callback_data="admin_alerts")],
+    [InlineKeyboardButton("♻️ Force Refresh", callback_data="admin_alerts:force")],
+    [InlineKeyboardButton("⬅ Back", callback_data="admin_back")]
+])
+
+POOL_STATS_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("🔄 Refresh", callback_data="admin_pool_stats")],
+    [InlineKeyboardButton("⬅ Back", callback_data="admin_back")]
+])
+
+# Aggregate admin views are cached in-process for this many seconds
+ADMIN_CACHE_TTL = 60
+
+# chat_data key holding (message_id, text digest, render digest) of the last admin render
+LAST_RENDER_KEY = "admin_last_render"
+
+def _digest(value: str) -> str:
+    return hashlib.blake2b(value.encode(), digest_size=8).hexdigest()
+
+async def edit_admin_message(query, context, text: str, reply_markup, fingerprint: Optional[str] = None):
+    """Edit the admin message, skipping the Telegram call when nothing changed"""
+    text_digest = _digest(text)
+    digest = text_digest if fingerprint is None else _digest(fingerprint)
+    message_id = query.message.message_id
+    last = context.chat_data.get(LAST_RENDER_KEY)
+    # Only the latest admin message per chat is tracked, so the state stays bounded
+    if last and last[0] != message_id:
+        last = None
+    
+    if last and last[2] == digest:
+        await query.answer("Up to date", show_alert=False)
+        return
+    
+    if last and last[1] == text_digest:
+        # Same body, new keyboard: only send the markup
+        await query.edit_message_reply_markup(reply_markup=reply_markup)
+    else:
+        await query.edit_message_text(
+            text=text,
+            reply_markup=reply_markup,
+            parse_mode='Markdown'
+        )
+    context.chat_data[LAST_RENDER_KEY] = (message_id, text_digest, digest)
+
 async def handle_admin(update, context):
     """Handle /admin command"""
     user_id = update.effective_user.id
-    admin_id = int(os.getenv("ADMIN_USER_ID", 0))
     
-    if user_id != admin_id:
+    if user_id != Config.ADMIN_USER_ID:
         await update.message.reply_text("❌ Access denied. Admin only.")
         return
     
     welcome_text = f"👑 **Admin Panel**\n\nWelcome {update.effective_user.first_name}!"
     
-    keyboard = [
-        [InlineKeyboardButton("👥 All Users", callback_data="admin_users")],
-        [InlineKeyboardButton("💰 Total Profits", callback_data="admin_profits")],
-        [InlineKeyboardButton("⏳ Pending Transactions", callback_data="admin_pending")],
-        [InlineKeyboardButton("📊 Statistics", callback_data="admin_stats")],
-        [InlineKeyboardButton("🔧 Force Actions", callback_data="admin_force")],
-        [InlineKeyboardButton("🔔 Alerts", callback_data="admin_alerts")],
-        [InlineKeyboardButton("⬅ Back to Bot", callback_data="back_to_main")]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    
-    await update.message.reply_text(
+    message = await update.message.reply_text(
         text=welcome_text,
-        reply_markup=reply_markup,
+        reply_markup=ADMIN_MAIN_MARKUP,
         parse_mode='Markdown'
     )
+    digest = _digest(welcome_text)
+    context.chat_data[LAST_RENDER_KEY] = (message.message_id, digest, digest)
 
 async def handle_admin_callback(query, context):
     """Handle admin callback queries"""
     data = query.data
     user_id = query.from_user.id
-    admin_id = int(os.getenv("ADMIN_USER_ID", 0))
     
-    if user_id != admin_id:
+    if user_id != Config.ADMIN_USER_ID:
         await query.answer("❌ Access denied", show_alert=True)
         return
     
-    if data == "admin_users":
-        await show_all_users(query, context)
-    elif data == "admin_profits":
-        await show_total_profits(query, context)
-    elif data == "admin_pending":
-        await show_pending_transactions(query, context)
-    elif data == "admin_stats":
-        await show_statistics(query, context)
-    elif data == "admin_force":
-        await show_force_actions(query, context)
-    elif data == "admin_alerts":
-        await show_alerts(query, context)
-    elif data == "admin_plan_breakdown":
-        await show_plan_breakdown(query, context)
-    elif data.startswith("force_approve_"):
-        tx_id = int(data.split("_")[2])
-        await force_approve_transaction(query, context, tx_id)
-    elif data.startswith("force_reject_"):
-        tx_id = int(data.split("_")[2])
-        await force_reject_transaction(query, context, tx_id)
-    elif data == "admin_back":
-        await admin_main_menu(query, context)
+    # "<view>:force" is the Force Refresh variant of a cached view
+    data, _, flag = data.partition(":")
+    ttl = 0 if flag == "force" else ADMIN_CACHE_TTL
+    
+    handler = _CACHED_VIEWS.get(data)
+    if handler:
+        await handler(query, context, ttl)
+        return
+    
+    handler = _VIEWS.get(data)
+    if handler:
+        await handler(query, context)
+        return
+    
+    for prefix, action in _TX_ACTIONS:
+        if data.startswith(prefix):
+            await action(query, context, int(data[len(prefix):]))
+            return
 
 async def show_all_users(query, context):
     """Show all users with their data"""
-    users_data = await database.get_all_users()
-    
-    users_text = "👥 **All Users**\n\n"
-    users_text += f"```\n{'ID':<8} {'Username':<12} {'Plan':<6} {'Status':<10} {'BTC':<12}\n"
-    users_text += "-" * 55 + "\n"
-    
-    for user in users_data[:20]:  # Show first 20 users
-        user_id = str(user['user_id'])[:8]
-        username = format_username(user['username'])[:12]
-        plan = user.get('plan_type', 'None')[:6]
-        status = user.get('status', 'N/A')[:10]
-        btc_amount = format_btc_amount(float(user.get('btc_amount', 0)))[:12]
-        
-        users_text += f"{user_id:<8} {username:<12} {plan:<6} {status:<10} {btc_amount:<12}\n"
+    users_data, total_rows = await asyncio.gather(
+        database.get_users_page(20),
+        database.get_users_count()
+    )
     
-    users_text += "```"
+    parts = [
+        "👥 **All Users**\n\n```\n",
+        _USERS_ROW_FMT.format('ID', 'Username', 'Plan', 'Status', 'BTC'),
+        "-" * 55 + "\n"
+    ]
     
-    if len(users_data) > 20:
-        users_text += f"\n... and {len(users_data) - 20} more users"
+    # Bind the per-row callables once instead of resolving globals every row
+    append, row_fmt = parts.append, _USERS_ROW_FMT.format
+    fmt_user, fmt_btc = format_username, format_btc_amount
+    for user in users_data:
+        append(row_fmt(
+            str(user['user_id'])[:8],
+            fmt_user(user['username'])[:12],
+            (user['plan_type'] or 'None')[:6],
+            (user['status'] or 'N/A')[:10],
+            fmt_btc(float(user['btc_amount'] or 0))[:12]
+        ))
     
-    keyboard = [
-        [InlineKeyboardButton("🔄 Refresh", callback_data="admin_users")],
-        [InlineKeyboardButton("⬅ Back", callback_data="admin_back")]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    parts.append("```")
     
-    await query.edit_message_text(
-        text=users_text,
-        reply_markup=reply_markup,
-        parse_mode='Markdown'
-    )
+    if total_rows > len(users_data):
+        parts.append(f"\n... and {total_rows - len(users_data)} more users")
+    
+    users_text = "".join(parts)
+    
+    await edit_admin_message(query, context, users_text, USERS_MARKUP)
 
-async def show_total_profits(query, context):
+async def show_total_profits(query, context, ttl: float = ADMIN_CACHE_TTL):
     """Show total profits and revenue"""
-    profits = await database.get_total_profits()
+    from bot.btc_api import get_btc_price
+    
+    # DB totals and the live BTC price are independent, fetch them together.
+    # Both keep their own caches; Force Refresh (ttl=0) only bypasses the totals
+    profits, current_btc_price = await asyncio.gather(
+        database.get_total_profits(database.AGGREGATE_CACHE_TTL if ttl else 0),
+        get_btc_price()
+    )
     
     total_btc = float(profits.get('total_btc', 0))
     total_usd = float(profits.get('total_usd', 0))
     total_transactions = profits.get('count', 0)
     
-    # Get current BTC price for live conversion
-    from bot.btc_api import get_btc_price
-    current_btc_price = await get_btc_price()
     current_btc_value = total_btc * current_btc_price if current_btc_price else 0
     
     profits_text = "💰 **Total Profits**\n\n"
@@ -132,195 +219,175 @@ async def show_total_profits(query, context):
         profit_emoji = "📈" if profit_loss >= 0 else "📉"
         profits_text += f"{profit_emoji} P&L: {format_currency(profit_loss)}\n"
     
-    keyboard = [
-        [InlineKeyboardButton("🔄 Refresh", callback_data="admin_profits")],
-        [InlineKeyboardButton("📊 Plan Breakdown", callback_data="admin_plan_breakdown")],
-        [InlineKeyboardButton("⬅ Back", callback_data="admin_back")]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    
-    await query.edit_message_text(
-        text=profits_text,
-        reply_markup=reply_markup,
-        parse_mode='Markdown'
-    )
+    await edit_admin_message(query, context, profits_text, PROFITS_MARKUP)
 
 async def show_pending_transactions(query, context):
     """Show all pending transactions with real-time data"""
-    pending_txs = await database.get_pending_transactions()
+    pending_txs = await database.get_pending_transactions(10)
     
-    current_time = datetime.utcnow().strftime('%H:%M:%S')
-    pending_text = f"⏳ **Pending Transactions** (Updated: {current_time})\n\n"
+    now = utc_now()
+    current_time = now.strftime('%H:%M:%S')
+    parts = [f"⏳ **Pending Transactions** (Updated: {current_time})\n\n"]
     
     if not pending_txs:
-        pending_text += "No pending transactions."
+        parts.append("No pending transactions.")
     else:
-        for i, tx in enumerate(pending_txs[:10], 1):
-            plan_config = PLAN_CONFIGS[PlanType(tx['plan_type'])]
-            time_left = tx['expires_at'] - datetime.utcnow()
+        fmt_btc = format_btc_amount
+        for i, tx in enumerate(pending_txs, 1):
+            plan_config = PLAN_CFG_BY_STR[tx['plan_type']]
+            seconds_left = (tx['expires_at'] - now).total_seconds()
             
-            pending_text += f"**{i}. Transaction #{tx['id']}**\n"
-            pending_text += f"User: {tx['user_id']}\n"
-            pending_text += f"Plan: {plan_config['emoji']} {plan_config['name']}\n"
-            pending_text += f"Amount: {format_btc_amount(float(tx['btc_amount']))} BTC\n"
-            pending_text += f"Address: `{tx['btc_address']}`\n"
+            parts.append(
+                f"**{i}. Transaction #{tx['id']}**\n"
+                f"User: {tx['user_id']}\n"
+                f"Plan: {plan_config['emoji']} {plan_config['name']}\n"
+                f"Amount: {fmt_btc(float(tx['btc_amount']))} BTC\n"
+                f"Address: `{tx['btc_address']}`\n"
+            )
             
-            if time_left.total_seconds() > 0:
-                minutes_left = int(time_left.total_seconds() // 60)
-                pending_text += f"Expires in: {minutes_left}m\n"
+            if seconds_left > 0:
+                minutes_left = int(seconds_left // 60)
+                parts.append(f"Expires in: {minutes_left}m\n\n")
             else:
-                pending_text += f"Status: ❌ Expired\n"
-            
-            pending_text += "\n"
+                parts.append("Status: ❌ Expired\n\n")
     
-    keyboard = [
-        [InlineKeyboardButton("🔄 Refresh", callback_data="admin_pending")],
-        [InlineKeyboardButton("🔧 Force Actions", callback_data="admin_force")],
-        [InlineKeyboardButton("⬅ Back", callback_data="admin_back")]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    pending_text = "".join(parts)
     
     try:
-        await query.edit_message_text(
-            text=pending_text,
-            reply_markup=reply_markup,
-            parse_mode='Markdown'
-        )
+        # Leave the "Updated" header out of the fingerprint so an unchanged
+        # list doesn't cost a Telegram round-trip
+        await edit_admin_message(query, context, pending_text, PENDING_MARKUP, fingerprint="".join(parts[1:]))
     except Exception as e:
         if "not modified" in str(e).lower():
             await query.answer("Data is already up to date.", show_alert=False)
         else:
             logger.error(f"Error updating admin pending: {e}")
 
-async def show_statistics(query, context):
+async def show_statistics(query, context, ttl: float = ADMIN_CACHE_TTL):
     """Show detailed statistics"""
-    # Get plan popularity stats
-    async with database.pool.acquire() as conn:
-        plan_stats = await conn.fetch("""
-            SELECT plan_type, COUNT(*) as count, SUM(usd_amount) as total_usd
-            FROM transactions WHERE status = 'confirmed'
-            GROUP BY plan_type
-        """)
-        
-        # Get user activity by day
-        activity_stats = await conn.fetch("""
-            SELECT DATE(created_at) as date, COUNT(*) as signups
-            FROM users
-            WHERE created_at >= CURRENT_DATE - INTERVAL '7 days'
-            GROUP BY DATE(created_at)
-            ORDER BY date DESC
-        """)
-        
-        # Get conversion rate
-        total_signups = await conn.fetchval("SELECT COUNT(*) FROM users")
-        total_payments = await conn.fetchval("SELECT COUNT(*) FROM transactions WHERE status = 'confirmed'")
-    
-    stats_text = "📊 **Statistics**\n\n"
+    # Plan popularity, 7-day signups and conversion totals in one round-trip,
+    # rows are told apart by the tag column
+    async def fetch_rows():
+        async with database.ro_pool.acquire() as conn:
+            stmt = await conn.prepared('statistics')
+            return await stmt.fetch()
+    
+    rows = await ttl_cached('statistics', ttl, fetch_rows)
+    
+    plan_stats = []
+    activity_stats = []
+    total_signups = 0
+    total_payments = 0
+    for row in rows:
+        tag = row['tag']
+        if tag == 'plan':
+            plan_stats.append(row)
+        elif tag == 'activity':
+            activity_stats.append(row)
+        elif tag == 'signups':
+            total_signups = row['count']
+        elif tag == 'payments':
+            total_payments = row['count']
+    activity_stats.sort(key=lambda row: row['key'], reverse=True)
     
     # Plan popularity
-    stats_text += "📈 **Plan Popularity:**\n"
+    parts = ["📊 **Statistics**\n\n📈 **Plan Popularity:**\n"]
     total_sales = sum(row['count'] for row in plan_stats)
     
     for row in plan_stats:
-        plan_config = PLAN_CONFIGS[PlanType(row['plan_type'])]
+        plan_config = PLAN_CFG_BY_STR[row['key']]
         percentage = calculate_percentage(row['count'], total_sales)
-        stats_text += f"{plan_config['emoji']} {row['plan_type']}: {row['count']} ({percentage:.1f}%)\n"
+        parts.append(f"{plan_config['emoji']} {row['key']}: {row['count']} ({percentage:.1f}%)\n")
     
     # Conversion rate
     conversion_rate = calculate_percentage(total_payments, total_signups) if total_signups > 0 else 0
-    stats_text += f"\n💹 **Conversion Rate:** {conversion_rate:.1f}%\n"
-    stats_text += f"Total Signups: {total_signups}\n"
-    stats_text += f"Total Payments: {total_payments}\n"
+    parts.append(
+        f"\n💹 **Conversion Rate:** {conversion_rate:.1f}%\n"
+        f"Total Signups: {total_signups}\n"
+        f"Total Payments: {total_payments}\n"
+    )
     
     # Recent activity
-    stats_text += f"\n📅 **Recent Activity (7 days):**\n"
+    parts.append("\n📅 **Recent Activity (7 days):**\n")
     for row in activity_stats:
-        stats_text += f"{row['date']}: {row['signups']} signups\n"
+        parts.append(f"{row['key']}: {row['count']} signups\n")
     
-    keyboard = [
-        [InlineKeyboardButton("🔄 Refresh", callback_data="admin_stats")],
-        [InlineKeyboardButton("⬅ Back", callback_data="admin_back")]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    stats_text = "".join(parts)
     
-    await query.edit_message_text(
-        text=stats_text,
-        reply_markup=reply_markup,
-        parse_mode='Markdown'
+    await edit_admin_message(query, context, stats_text, STATS_MARKUP)
+
+def _force_action_rows(tx) -> Tuple[list, list]:
+    """Approve and reject keyboard rows for one pending transaction"""
+    tx_id = tx['id']
+    plan_config = PLAN_CFG_BY_STR[tx['plan_type']]
+    tx_info = f"#{tx_id} - {plan_config['emoji']} {tx['plan_type']} - {format_btc_amount(float(tx['btc_amount']))} BTC"
+    return (
+        [InlineKeyboardButton(f"✅ Approve {tx_info}", callback_data=f"force_approve_{tx_id}")],
+        [InlineKeyboardButton(f"❌ Reject {tx_info}", callback_data=f"force_reject_{tx_id}")]
     )
 
-async def show_force_actions(query, context):
+def _pending_without(context, tx_id: int) -> Optional[list]:
+    """Cached force-actions list minus tx_id, or None when it should be re-queried"""
+    cached_at, txs = context.user_data.get('admin_pending_cache', (0.0, []))
+    remaining = [tx for tx in txs if tx['id'] != tx_id]
+    if not remaining or time.monotonic() - cached_at >= Config.ADMIN_PENDING_CACHE_TTL:
+        return None
+    
+    context.user_data['admin_pending_cache'] = (cached_at, remaining)
+    return remaining
+
+async def show_force_actions(query, context, pending_txs: Optional[list] = None):
     """Show force approve/reject options"""
-    pending_txs = await database.get_pending_transactions()
+    txs = pending_txs
+    if txs is None:
+        txs = await database.get_pending_transactions(5)  # Show first 5 transactions
+        context.user_data['admin_pending_cache'] = (time.monotonic(), txs)
     
-    force_text = "🔧 **Force Actions**\n\n"
-    force_text += "Select a transaction to approve or reject:\n\n"
-    
-    keyboard = []
-    
-    for tx in pending_txs[:5]:  # Show first 5 transactions
-        plan_config = PLAN_CONFIGS[PlanType(tx['plan_type'])]
-        tx_info = f"#{tx['id']} - {plan_config['emoji']} {tx['plan_type']} - {format_btc_amount(float(tx['btc_amount']))} BTC"
-        
-        keyboard.extend([
-            [InlineKeyboardButton(f"✅ Approve {tx_info}", callback_data=f"force_approve_{tx['id']}")],
-            [InlineKeyboardButton(f"❌ Reject {tx_info}", callback_data=f"force_reject_{tx['id']}")]
-        ])
-    
-    if not pending_txs:
+    force_text = "🔧 **Force Actions**\n\nSelect a transaction to approve or reject:\n\n"
+    if not txs:
         force_text += "No pending transactions to manage."
     
+    keyboard = [row for tx in txs for row in _force_action_rows(tx)]
     keyboard.append([InlineKeyboardButton("⬅ Back", callback_data="admin_back")])
     reply_markup = InlineKeyboardMarkup(keyboard)
     
-    await query.edit_message_text(
-        text=force_text,
-        reply_markup=reply_markup,
-        parse_mode='Markdown'
-    )
+    fingerprint = force_text + ",".join(str(tx['id']) for tx in txs)
+    await edit_admin_message(query, context, force_text, reply_markup, fingerprint=fingerprint)
 
 async def force_approve_transaction(query, context, tx_id: int):
     """Force approve a transaction"""
     try:
-        # Get transaction details
-        async with database.pool.acquire() as conn:
-            tx = await conn.fetchrow("SELECT * FROM transactions WHERE id = $1", tx_id)
+        # Force approve, only if still pending, and create the subscription in
+        # the same transaction so the user is never confirmed without one
+        now = utc_now()
+        async with database.transaction() as conn:
+            tx = await database.approve_pending_transaction(tx_id, now, conn=conn)
+            if tx:
+                plan_type = tx['plan_type']
+                expires_at = None
+                
+                plan_config = PLAN_CFG_BY_STR[plan_type]
+                if plan_config["duration_days"]:
+                    expires_at = now + timedelta(days=plan_config["duration_days"])
+                
+                await database.create_subscription(tx['user_id'], plan_type, tx_id, expires_at, conn=conn)
         
         if not tx:
-            await query.answer("Transaction not found", show_alert=True)
-            return
-        
-        if tx['status'] != 'pending':
-            await query.answer("Transaction is not pending", show_alert=True)
+            await query.answer("Transaction not found or no longer pending", show_alert=True)
             return
         
-        # Force approve
-        await database.update_transaction_status(tx_id, 'confirmed', datetime.utcnow())
-        
-        # Create subscription
-        plan_type = tx['plan_type']
-        expires_at = None
-        
-        if PLAN_CONFIGS[PlanType(plan_type)]["duration_days"]:
-            expires_at = datetime.utcnow() + timedelta(days=PLAN_CONFIGS[PlanType(plan_type)]["duration_days"])
-        
-        await database.create_subscription(tx['user_id'], plan_type, tx_id, expires_at)
+        invalidate_cached(*database.CONFIRMATION_CACHE_KEYS)
+        invalidate_balance(tx['btc_address'])
         
         # Notify user with proper confirmation message
-        from bot.core.config import Config
-        from bot.models import get_plan_configs
-        
-        plan_configs = get_plan_configs()
-        plan_config = plan_configs[PlanType(plan_type)]
         vip_link = Config.VIP_LINKS.get(plan_type, "")
         
         confirmation_text = f"✅ Payment Approved by Admin!\n\n"
         confirmation_text += f"Welcome to {plan_config['emoji']} {plan_config['name']}!\n\n"
         confirmation_text += f"💰 Amount: {format_btc_amount(float(tx['btc_amount']))} BTC\n"
 
-        if plan_config["duration_days"]:
-            expires_date = datetime.utcnow() + timedelta(days=plan_config["duration_days"])
-            confirmation_text += f"⏰ Expires: {expires_date.strftime('%Y-%m-%d')}\n"
+        if expires_at:
+            confirmation_text += f"⏰ Expires: {expires_at.strftime('%Y-%m-%d')}\n"
         else:
             confirmation_text += f"⏰ Duration: Lifetime\n"
 
@@ -334,14 +401,20 @@ async def force_approve_transaction(query, context, tx_id: int):
         ]
         reply_markup = InlineKeyboardMarkup(keyboard)
 
-        await context.bot.send_message(
-            chat_id=tx['user_id'],
-            text=confirmation_text,
-            reply_markup=reply_markup
+        # The approval has committed; a failed notification must not report it as failed
+        results = await asyncio.gather(
+            context.bot.send_message(
+                chat_id=tx['user_id'],
+                text=confirmation_text,
+                reply_markup=reply_markup
+            ),
+            query.answer("✅ Transaction approved successfully!", show_alert=True),
+            return_exceptions=True
         )
-        
-        await query.answer("✅ Transaction approved successfully!", show_alert=True)
-        await show_force_actions(query, context)
+        for result in results:
+            if isinstance(result, Exception):
+                logger.warning(f"Notification after approving transaction {tx_id} failed: {result}")
+        await show_force_actions(query, context, pending_txs=_pending_without(context, tx_id))
         
     except Exception as e:
         logger.error(f"Error force approving transaction {tx_id}: {e}")
@@ -350,27 +423,24 @@ async def force_approve_transaction(query, context, tx_id: int):
 async def force_reject_transaction(query, context, tx_id: int):
     """Force reject a transaction"""
     try:
-        # Get transaction details
+        # Force reject, only if still pending
         async with database.pool.acquire() as conn:
-            tx = await conn.fetchrow("SELECT * FROM transactions WHERE id = $1", tx_id)
+            stmt = await conn.prepared('reject_pending_tx')
+            tx = await stmt.fetchrow(tx_id)
         
         if not tx:
-            await query.answer("Transaction not found", show_alert=True)
+            await query.answer("Transaction not found or no longer pending", show_alert=True)
             return
         
-        if tx['status'] != 'pending':
-            await query.answer("Transaction is not pending", show_alert=True)
-            return
-        
-        # Force reject
-        await database.update_transaction_status(tx_id, 'cancelled')
+        invalidate_cached('plan_breakdown', 'statistics')
         
         # Release BTC address
         await database.release_btc_address(tx['btc_address'])
+        invalidate_balance(tx['btc_address'])
         
         # Notify user
         reject_text = f"❌ Payment Rejected\n\n"
-        reject_text += f"Your payment for {PLAN_CONFIGS[PlanType(tx['plan_type'])]['name']} has been rejected by admin.\n"
+        reject_text += f"Your payment for {PLAN_CFG_BY_STR[tx['plan_type']]['name']} has been rejected by admin.\n"
         reject_text += f"Please contact support if you believe this is an error."
         
         await context.bot.send_message(
@@ -379,122 +449,119 @@ async def force_reject_transaction(query, context, tx_id: int):
         )
         
         await query.answer("❌ Transaction rejected successfully!", show_alert=True)
-        await show_force_actions(query, context)
+        await show_force_actions(query, context, pending_txs=_pending_without(context, tx_id))
         
     except Exception as e:
         logger.error(f"Error force rejecting transaction {tx_id}: {e}")
         await query.answer("❌ Error rejecting transaction", show_alert=True)
 
-async def show_plan_breakdown(query, context):
+async def show_plan_breakdown(query, context, ttl: float = ADMIN_CACHE_TTL):
     """Show plan breakdown statistics"""
-    async with database.pool.acquire() as conn:
-        plan_stats = await conn.fetch("""
-            SELECT plan_type, 
-                   COUNT(*) as total_transactions,
-                   COUNT(CASE WHEN status = 'confirmed' THEN 1 END) as confirmed,
-                   COUNT(CASE WHEN status = 'pending' THEN 1 END) as pending,
-                   COUNT(CASE WHEN status = 'expired' THEN 1 END) as expired,
-                   COALESCE(SUM(CASE WHEN status = 'confirmed' THEN usd_amount END), 0) as revenue
-            FROM transactions 
-            GROUP BY plan_type
-            ORDER BY revenue DESC
-        """)
-    
-    breakdown_text = "📊 **Plan Breakdown**\n\n"
+    async def fetch_plan_stats():
+        async with database.ro_pool.acquire() as conn:
+            stmt = await conn.prepared('plan_breakdown')
+            return await stmt.fetch()
+    
+    plan_stats = await ttl_cached('plan_breakdown', ttl, fetch_plan_stats)
+    
+    parts = ["📊 **Plan Breakdown**\n\n"]
     
     for stat in plan_stats:
-        plan_config = PLAN_CONFIGS[PlanType(stat['plan_type'])]
-        breakdown_text += f"{plan_config['emoji']} **{plan_config['name']}**\n"
-        breakdown_text += f"Total Transactions: {stat['total_transactions']}\n"
-        breakdown_text += f"✅ Confirmed: {stat['confirmed']}\n"
-        breakdown_text += f"⏳ Pending: {stat['pending']}\n"
-        breakdown_text += f"❌ Expired: {stat['expired']}\n"
-        breakdown_text += f"💰 Revenue: {format_currency(float(stat['revenue']))}\n\n"
+        plan_config = PLAN_CFG_BY_STR[stat['plan_type']]
+        parts.append(
+            f"{plan_config['emoji']} **{plan_config['name']}**\n"
+            f"Total Transactions: {stat['total_transactions']}\n"
+            f"✅ Confirmed: {stat['confirmed']}\n"
+            f"⏳ Pending: {stat['pending']}\n"
+            f"❌ Expired: {stat['expired']}\n"
+            f"💰 Revenue: {format_currency(float(stat['revenue']))}\n\n"
+        )
     
     if not plan_stats:
-        breakdown_text += "No transaction data available."
+        parts.append("No transaction data available.")
     
-    keyboard = [
-        [InlineKeyboardButton("🔄 Refresh", callback_data="admin_plan_breakdown")],
-        [InlineKeyboardButton("⬅ Back", callback_data="admin_profits")]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    breakdown_text = "".join(parts)
     
-    await query.edit_message_text(
-        text=breakdown_text,
-        reply_markup=reply_markup,
-        parse_mode='Markdown'
-    )
+    await edit_admin_message(query, context, breakdown_text, PLAN_BREAKDOWN_MARKUP)
 
-async def show_alerts(query, context):
+async def show_alerts(query, context, ttl: float = ADMIN_CACHE_TTL):
     """Show admin alerts and notifications"""
-    alerts_text = "🔔 **Admin Alerts**\n\n"
-    
-    # Get users who started but haven't paid within 10 minutes
-    async with database.pool.acquire() as conn:
-        unpaid_users = await conn.fetch("""
-            SELECT u.user_id, u.first_name, u.username, u.created_at
-            FROM users u
-            LEFT JOIN transactions t ON u.user_id = t.user_id
-            WHERE u.created_at >= CURRENT_TIMESTAMP - INTERVAL '10 minutes'
-            AND (t.id IS NULL OR t.status = 'pending')
-            ORDER BY u.created_at DESC
-        """)
-        
-        # Get recent expired transactions
-        expired_recent = await conn.fetch("""
-            SELECT user_id, plan_type, btc_amount, expires_at
-            FROM transactions
-            WHERE status = 'expired' 
-            AND expires_at >= CURRENT_TIMESTAMP - INTERVAL '1 hour'
-            ORDER BY expires_at DESC
-        """)
+    # Users who started but haven't paid within 10 minutes and transactions
+    # expired in the last hour, fetched together and split by tag
+    async def fetch_rows():
+        async with database.ro_pool.acquire() as conn:
+            stmt = await conn.prepared('alerts')
+            return await stmt.fetch()
+    
+    rows = await ttl_cached('alerts', ttl, fetch_rows)
+    
+    unpaid_users = [row for row in rows if row['tag'] == 'unpaid']
+    expired_recent = [row for row in rows if row['tag'] == 'expired']
+    
+    parts = ["🔔 **Admin Alerts**\n\n"]
     
     if unpaid_users:
-        alerts_text += f"⚠️ **Users Started but Not Paid (10min):**\n"
+        parts.append("⚠️ **Users Started but Not Paid (10min):**\n")
         for user in unpaid_users[:5]:
-            alerts_text += f"• {user['first_name']} (@{user['username'] or 'no_username'}) - {user['user_id']}\n"
-        alerts_text += "\n"
+            name = escape_md(user['first_name'])
+            username = escape_md(user['username'] or 'no_username')
+            parts.append(f"• {name} (@{username}) - {user['user_id']}\n")
+        parts.append("\n")
     
     if expired_recent:
-        alerts_text += f"⏰ **Recently Expired (1hr):**\n"
+        parts.append("⏰ **Recently Expired (1hr):**\n")
         for tx in expired_recent[:5]:
-            plan_config = PLAN_CONFIGS[PlanType(tx['plan_type'])]
-            alerts_text += f"• {plan_config['emoji']} {tx['plan_type']} - {format_btc_amount(float(tx['btc_amount']))} BTC\n"
-        alerts_text += "\n"
+            plan_config = PLAN_CFG_BY_STR[tx['plan_type']]
+            parts.append(f"• {plan_config['emoji']} {tx['plan_type']} - {format_btc_amount(float(tx['btc_amount']))} BTC\n")
+        parts.append("\n")
     
     if not unpaid_users and not expired_recent:
-        alerts_text += "✅ No recent alerts."
+        parts.append("✅ No recent alerts.")
     
-    keyboard = [
-        [InlineKeyboardButton("🔄 Refresh", callback_data="admin_alerts")],
-        [InlineKeyboardButton("⬅ Back", callback_data="admin_back")]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    alerts_text = "".join(parts)
     
-    await query.edit_message_text(
-        text=alerts_text,
-        reply_markup=reply_markup,
-        parse_mode='Markdown'
-    )
+    await edit_admin_message(query, context, alerts_text, ALERTS_MARKUP)
+
+async def show_pool_stats(query, context):
+    """Show database pool and prepared statement counters"""
+    stats = database.get_pool_stats()
+    
+    if not stats:
+        stats_text = "🗄 **Pool Stats**\n\nDatabase pool is not initialized."
+    else:
+        stats_text = (
+            "🗄 **Pool Stats**\n\n"
+            f"Connections: {stats['size']} ({stats['idle']} idle)\n"
+            f"Pool bounds: {stats['min_size']}-{stats['max_size']}\n"
+            f"Statements prepared: {stats['prepared']}\n"
+            f"Prepared reuses: {stats['prepared_hits']}"
+        )
+    
+    await edit_admin_message(query, context, stats_text, POOL_STATS_MARKUP)
 
 async def admin_main_menu(query, context):
     """Return to admin main menu"""
     welcome_text = f"👑 **Admin Panel**\n\nWelcome {query.from_user.first_name}!"
     
-    keyboard = [
-        [InlineKeyboardButton("👥 All Users", callback_data="admin_users")],
-        [InlineKeyboardButton("💰 Total Profits", callback_data="admin_profits")],
-        [InlineKeyboardButton("⏳ Pending Transactions", callback_data="admin_pending")],
-        [InlineKeyboardButton("📊 Statistics", callback_data="admin_stats")],
-        [InlineKeyboardButton("🔧 Force Actions", callback_data="admin_force")],
-        [InlineKeyboardButton("🔔 Alerts", callback_data="admin_alerts")],
-        [InlineKeyboardButton("⬅ Back to Bot", callback_data="back_to_main")]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    
-    await query.edit_message_text(
-        text=welcome_text,
-        reply_markup=reply_markup,
-        parse_mode='Markdown'
-    )
+    await edit_admin_message(query, context, welcome_text, ADMIN_MAIN_MARKUP)
+
+# Callback dispatch tables, defined after the handlers they reference
+_CACHED_VIEWS = {
+    "admin_profits": show_total_profits,
+    "admin_stats": show_statistics,
+    "admin_alerts": show_alerts,
+    "admin_plan_breakdown": show_plan_breakdown
+}
+
+_VIEWS = {
+    "admin_users": show_all_users,
+    "admin_pending": show_pending_transactions,
+    "admin_force": show_force_actions,
+    "admin_pool_stats": show_pool_stats,
+    "admin_back": admin_main_menu
+}
+
+_TX_ACTIONS = (
+    ("force_approve_", force_approve_transaction),
+    ("force_reject_", force_reject_transaction)
+)
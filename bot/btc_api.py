@@ -1,12 +1,141 @@
 import os
+import time
 import aiohttp
 import logging
-from typing import Optional, List, Dict, Any
+from collections import defaultdict
+from types import MappingProxyType
+from typing import Optional, List, Dict, Any, Tuple, Mapping, Callable
 import asyncio
 import json
 
+try:
+    # orjson.JSONDecodeError subclasses json.JSONDecodeError, so handlers stay the same
+    from orjson import loads as json_loads
+except ImportError:
+    json_loads = json.loads
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
 logger = logging.getLogger(__name__)
 
+# A fetched price is reused for this many seconds
+PRICE_CACHE_TTL = 20
+
+# A fetched address balance is reused for this many seconds
+BALANCE_CACHE_TTL = float(os.getenv("BTC_BALANCE_CACHE_TTL", "30"))
+
+# At most this many addresses are looked up at once by check_addresses_bulk
+BULK_BALANCE_CONCURRENCY = int(os.getenv("BTC_BULK_BALANCE_CONCURRENCY", "10"))
+
+SATOSHIS_PER_BTC = 100_000_000
+
+# Request timeouts are immutable, so build them once
+_PRICE_TIMEOUT = aiohttp.ClientTimeout(total=10)
+_BALANCE_TIMEOUT = aiohttp.ClientTimeout(total=15)
+_DOUBLESPEND_TIMEOUT = aiohttp.ClientTimeout(total=10)
+
+_BLOCKSTREAM_TXS_URL = "https://blockstream.info/api/address/{}/txs"
+
+# Outputs within this many satoshis of the expected amount count as a match
+DOUBLE_SPEND_TOLERANCE_SAT = 1000
+
+def _parse_coingecko(data): return float(data['bitcoin']['usd'])
+def _parse_price(data): return float(data['price'])
+def _parse_coincap(data): return float(data['data']['priceUsd'])
+def _parse_cryptocompare(data): return float(data['USD'])
+def _parse_coindesk(data): return float(data['bpi']['USD']['rate_float'])
+def _parse_bitfinex(data): return float(data['last_price'])
+def _parse_kraken(data): return float(next(iter(data['result'].values()))['c'][0])
+def _parse_last(data): return float(data['last'])
+def _parse_bittrex(data): return float(data['lastTradeRate'])
+def _parse_huobi(data): return float(data['tick']['close'])
+def _parse_kucoin(data): return float(data['data']['price'])
+def _parse_okx(data): return float(data['data'][0]['last'])
+def _parse_bybit(data): return float(data['result'][0]['last_price'])
+def _parse_crypto_com(data): return float(data['result']['data'][0]['a'])
+def _parse_bitget(data): return float(data['data']['close'])
+def _parse_phemex(data): return float(data['result']['close']) / 10000  # Phemex uses scaled prices
+
+def _parse_fallback_price(data):
+    """Fallback for unexpected formats, trying common keys"""
+    return float(data.get('price', data.get('last', data.get('rate', 0))))
+
+# Price response parsers keyed by exchange domain
+_PRICE_PARSERS: Mapping[str, Callable] = MappingProxyType({
+    'coingecko.com': _parse_coingecko,
+    'binance.com': _parse_price,
+    'coincap.io': _parse_coincap,
+    'cryptocompare.com': _parse_cryptocompare,
+    'coindesk.com': _parse_coindesk,
+    'bitfinex.com': _parse_bitfinex,
+    'kraken.com': _parse_kraken,
+    'bitstamp.net': _parse_last,
+    'gemini.com': _parse_last,
+    'bittrex.com': _parse_bittrex,
+    'huobi.pro': _parse_huobi,
+    'kucoin.com': _parse_kucoin,
+    'gate.io': _parse_last,
+    'okx.com': _parse_okx,
+    'mexc.com': _parse_price,
+    'bybit.com': _parse_bybit,
+    'crypto.com': _parse_crypto_com,
+    'bitget.com': _parse_bitget,
+    'phemex.com': _parse_phemex,
+})
+
+# Balance parsers return integer satoshis of *confirmed* funds only, so racing
+# explorers agree; conversion to BTC happens once per check
+
+def _balance_utxo_sum(data, addr):
+    """Blockstream and mempool.space return UTXO data, so we sum the confirmed ones"""
+    return sum(utxo.get('value', 0) for utxo in data if utxo.get('status', {}).get('confirmed'))
+
+def _balance_blockcypher(data, addr):
+    # 'balance' is confirmed only; 'final_balance' would add the mempool
+    return data.get('balance', 0)
+
+def _balance_blockchain_info(data, addr):
+    """Sum of outputs with at least one confirmation"""
+    return sum(utxo.get('value', 0) for utxo in data.get('unspent_outputs', ()))
+
+def _balance_blockchair(data, addr):
+    return data.get('data', {}).get(addr, {}).get('address', {}).get('balance', 0)
+
+# (path template, balance parser) keyed by explorer domain
+_BALANCE_SPECS: Mapping[str, Tuple[str, Callable]] = MappingProxyType({
+    'blockstream.info': ('address/{addr}/utxo', _balance_utxo_sum),
+    'mempool.space': ('address/{addr}/utxo', _balance_utxo_sum),
+    'blockcypher.com': ('addrs/{addr}/balance', _balance_blockcypher),
+    'blockchain.info': ('unspent?active={addr}&confirmations=1', _balance_blockchain_info),
+    'blockchair.com': ('dashboards/address/{addr}', _balance_blockchair),
+})
+
+async def _iter_json_array(response: aiohttp.ClientResponse):
+    """Yield the items of a JSON array response, streaming them when ijson is installed"""
+    if ijson is not None:
+        async for item in ijson.items(response.content, 'item', use_float=True):
+            yield item
+    else:
+        for item in json_loads(await response.read()):
+            yield item
+
+def _host(url: str) -> str:
+    """Lower-cased hostname of url, without scheme, credentials, port or path"""
+    netloc = url.partition('://')[2].partition('/')[0]
+    return netloc.rpartition('@')[2].partition(':')[0].lower()
+
+def _lookup_host(table: Mapping[str, Any], url: str) -> Optional[Any]:
+    """Find the table entry for url's hostname or its closest parent domain"""
+    labels = _host(url).split('.')
+    for i in range(len(labels) - 1):
+        entry = table.get('.'.join(labels[i:]))
+        if entry is not None:
+            return entry
+    return None
+
 class SecureBTCLogger:
     """Secure logger that masks sensitive BTC addresses"""
     @staticmethod
@@ -42,6 +171,35 @@ class BTCPriceAPI:
     def __init__(self):
         self.price_apis = self._load_price_apis()
         self.blockchain_apis = self._load_blockchain_apis()
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._price_cache: Optional[Tuple[float, float]] = None  # (price, expires at)
+        self._price_inflight: Optional[asyncio.Task] = None
+        self._balance_cache: Dict[str, Tuple[float, float]] = {}  # address -> (balance, expires at)
+        self._balance_locks: Dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+        # (address, expected satoshis) -> (ETag, result) of the last full double-spend scan
+        self._tx_etag: Dict[Tuple[str, int], Tuple[str, bool]] = {}
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Return the shared HTTP session, creating it on first use or after close"""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                timeout=_PRICE_TIMEOUT,
+                # Ask for compressed bodies; aiohttp decompresses transparently
+                headers={'Accept-Encoding': 'gzip, deflate', 'User-Agent': 'VipBotGate/1.0'},
+                connector=aiohttp.TCPConnector(
+                    limit=100,
+                    limit_per_host=8,
+                    ttl_dns_cache=300,
+                    keepalive_timeout=60
+                )
+            )
+        return self._session
+
+    async def aclose(self):
+        """Close the shared HTTP session"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
 
     def _load_price_apis(self) -> List[Dict[str, Any]]:
         """Load all BTC price APIs from environment"""
@@ -54,11 +212,20 @@ class BTCPriceAPI:
                 apis.append({
                     'url': api_url,
                     'name': f'API_{i}',
-                    'parser': self._get_price_parser(api_url)
+                    'parser': self._price_parser_for(api_url)
                 })
 
         return apis
 
+    @staticmethod
+    def _price_parser_for(api_url: str) -> Callable:
+        """Known parser for api_url's exchange, or the generic fallback"""
+        parser = _lookup_host(_PRICE_PARSERS, api_url)
+        if parser is None:
+            logger.info(f"No dedicated parser for price API host {_host(api_url)}, using fallback")
+            return _parse_fallback_price
+        return parser
+
     def _load_blockchain_apis(self) -> List[Dict[str, Any]]:
         """Load all blockchain APIs from environment"""
         apis = []
@@ -66,159 +233,202 @@ class BTCPriceAPI:
         # Load all blockchain APIs from environment
         for i in range(1, 21):  # 20 blockchain APIs
             api_url = os.getenv(f"BTC_API_{i}")
-            if api_url:
-                apis.append({
-                    'url': api_url,
-                    'name': f'BLOCKCHAIN_API_{i}',
-                    'parser': self._get_balance_parser(api_url)
-                })
+            if not api_url:
+                continue
+            
+            spec = _lookup_host(_BALANCE_SPECS, api_url)
+            if spec is None:
+                logger.debug(f"Skipping unsupported blockchain API: {api_url}")
+                continue
+            
+            path, parser = spec
+            apis.append({
+                'url': api_url,
+                'name': f'BLOCKCHAIN_API_{i}',
+                # Bound str.format of the full URL template, called as build_url(addr=...)
+                'build_url': f"{api_url}/{path}".format,
+                'parser': parser
+            })
 
         return apis
 
-    def _get_price_parser(self, url: str):
-        """Get appropriate parser for price API"""
-        if 'coingecko' in url:
-            return lambda data: float(data['bitcoin']['usd'])
-        elif 'binance' in url:
-            return lambda data: float(data['price'])
-        elif 'coincap' in url:
-            return lambda data: float(data['data']['priceUsd'])
-        elif 'cryptocompare' in url:
-            return lambda data: float(data['USD'])
-        elif 'coindesk' in url:
-            return lambda data: float(data['bpi']['USD']['rate_float'])
-        elif 'bitfinex' in url:
-            return lambda data: float(data['last_price'])
-        elif 'kraken' in url:
-            return lambda data: float(list(data['result'].values())[0]['c'][0])
-        elif 'bitstamp' in url:
-            return lambda data: float(data['last'])
-        elif 'gemini' in url:
-            return lambda data: float(data['last'])
-        elif 'bittrex' in url:
-            return lambda data: float(data['lastTradeRate'])
-        elif 'huobi' in url:
-            return lambda data: float(data['tick']['close'])
-        elif 'kucoin' in url:
-            return lambda data: float(data['data']['price'])
-        elif 'gate.io' in url:
-            return lambda data: float(data['last'])
-        elif 'okx' in url:
-            return lambda data: float(data['data'][0]['last'])
-        elif 'mexc' in url:
-            return lambda data: float(data['price'])
-        elif 'bybit' in url:
-            return lambda data: float(data['result'][0]['last_price'])
-        elif 'crypto.com' in url:
-            return lambda data: float(data['result']['data'][0]['a'])
-        elif 'bitget' in url:
-            return lambda data: float(data['data']['close'])
-        elif 'phemex' in url:
-            return lambda data: float(data['result']['close']) / 10000  # Phemex uses scaled prices
-        else:
-            # Fallback for unexpected formats, trying common keys
-            return lambda data: float(data.get('price', data.get('last', data.get('rate', 0))))
-
-    def _get_balance_parser(self, url: str):
-        """Get appropriate parser for balance API"""
-        # Blockstream and mempool.space often return UTXO data, so we sum them
-        if 'blockstream' in url or 'mempool.space' in url:
-            return lambda data, addr: sum([utxo.get('value', 0) for utxo in data]) / 100000000
-        elif 'blockcypher' in url:
-            return lambda data, addr: data.get('balance', 0) / 100000000
-        elif 'blockchain.info' in url:
-            return lambda data, addr: data.get('final_balance', 0) / 100000000
-        elif 'blockchair' in url:
-            return lambda data, addr: data.get('data', {}).get(addr, {}).get('address', {}).get('balance', 0) / 100000000
-        else:
-            # Fallback for unexpected formats, trying common keys for balance
-            return lambda data, addr: float(data.get('balance', 0)) / 100000000
+    async def _fetch_price(self, session: aiohttp.ClientSession, api: Dict[str, Any]) -> Optional[float]:
+        """Fetch the price from one source, returning None on any failure"""
+        try:
+            secure_logger.log_api_call(api['url'])
+            async with session.get(api['url'], timeout=_PRICE_TIMEOUT) as response:
+                if response.status == 200:
+                    data = json_loads(await response.read())
+                    price = api['parser'](data)
+                    if price > 0:
+                        logger.info(f"BTC price from {api['name']}: ${price:,.2f}")
+                        return price
+                    logger.warning(f"Received non-positive price from {api['name']}: {price}")
+                else:
+                    logger.warning(f"HTTP {response.status} from price source {api['name']}: {response.reason}")
+        except asyncio.TimeoutError:
+            secure_logger.log_error(f"{api['name']} timed out", None)
+        except aiohttp.ClientConnectorError as e:
+            secure_logger.log_error(f"{api['name']} connection error: {e}", None)
+        except json.JSONDecodeError:
+            secure_logger.log_error(f"{api['name']} returned invalid JSON", None)
+        except Exception as e:
+            secure_logger.log_error(f"{api['name']} failed: {type(e).__name__} - {str(e)}", None)
+        return None
 
     async def get_btc_price(self) -> float:
         """Get BTC price from multiple sources with fallback"""
-        for api in self.price_apis:
-            try:
-                async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10)) as session:
-                    secure_logger.log_api_call(api['url'])
-                    async with session.get(api['url']) as response:
-                        if response.status == 200:
-                            data = await response.json()
-                            price = api['parser'](data)
-                            if price > 0:
-                                logger.info(f"BTC price from {api['name']}: ${price:,.2f}")
-                                return price
-                            else:
-                                logger.warning(f"Received non-positive price from {api['name']}: {price}")
-                        else:
-                            logger.warning(f"HTTP {response.status} from price source {api['name']}: {response.reason}")
-            except asyncio.TimeoutError:
-                secure_logger.log_error(f"{api['name']} timed out", None)
-                continue
-            except aiohttp.ClientConnectorError as e:
-                secure_logger.log_error(f"{api['name']} connection error: {e}", None)
-                continue
-            except json.JSONDecodeError:
-                secure_logger.log_error(f"{api['name']} returned invalid JSON", None)
-                continue
-            except Exception as e:
-                secure_logger.log_error(f"{api['name']} failed: {type(e).__name__} - {str(e)}", None)
-                continue
+        cached = self._price_cache
+        if cached and time.monotonic() < cached[1]:
+            return cached[0]
+        
+        # Concurrent callers share one in-flight fetch
+        if self._price_inflight is None:
+            self._price_inflight = asyncio.create_task(self._refresh_price())
+        price = await asyncio.shield(self._price_inflight)
+        if price:
+            return price
 
         # Ultimate fallback - get from environment but log warning
         fallback_price = float(os.getenv("FALLBACK_BTC_PRICE", 92000))
         logger.warning(f"All price APIs failed! Using fallback price: ${fallback_price:,.2f}")
         return fallback_price
 
+    async def _refresh_price(self) -> Optional[float]:
+        """Fetch a fresh price and cache it; the fallback price is never cached"""
+        try:
+            price = await self._fetch_fastest_price()
+            if price:
+                self._price_cache = (price, time.monotonic() + PRICE_CACHE_TTL)
+            return price
+        finally:
+            self._price_inflight = None
+
+    async def _fetch_fastest_price(self) -> Optional[float]:
+        """Query every source at once and take the first valid answer"""
+        session = await self._get_session()
+        tasks = [asyncio.create_task(self._fetch_price(session, api)) for api in self.price_apis]
+        try:
+            for done in asyncio.as_completed(tasks):
+                price = await done
+                if price:
+                    return price
+        finally:
+            for task in tasks:
+                task.cancel()
+        return None
+
+    async def _fetch_balance(self, session: aiohttp.ClientSession, api: Dict[str, Any], address: str) -> Optional[int]:
+        """Fetch the balance in satoshis from one explorer, returning None on any failure"""
+        try:
+            url = api['build_url'](addr=address)
+            secure_logger.log_api_call(url, address)
+            async with session.get(url, timeout=_BALANCE_TIMEOUT) as response:
+                if response.status == 200:
+                    data = json_loads(await response.read())
+                    balance_sat = int(api['parser'](data, address))
+                    logger.debug(f"Balance from {api['name']} for {address}: {balance_sat} sat")
+                    return balance_sat
+                
+                logger.warning(f"HTTP {response.status} from blockchain source {api['name']} for {address}: {response.reason}")
+                if response.status == 404: # Address not found or invalid
+                    logger.debug(f"Address {address} not found or invalid by {api['name']}.")
+        except asyncio.TimeoutError:
+            secure_logger.log_error(f"{api['name']} timed out for address {address}", address)
+        except aiohttp.ClientConnectorError as e:
+            secure_logger.log_error(f"{api['name']} connection error for address {address}: {e}", address)
+        except json.JSONDecodeError:
+            secure_logger.log_error(f"{api['name']} returned invalid JSON for address {address}", address)
+        except Exception as e:
+            secure_logger.log_error(f"{api['name']} failed for address {address}: {type(e).__name__} - {str(e)}", address)
+        return None
+
     async def check_address_balance(self, address: str) -> float:
         """Check BTC address balance from multiple sources"""
         if not address or len(address) < 26:
             logger.warning("Invalid address provided for balance check.")
             return 0.0
 
-        for api in self.blockchain_apis:
-            try:
-                # Construct URL based on API type
-                if 'blockstream' in api['url'] or 'mempool.space' in api['url']:
-                    url = f"{api['url']}/address/{address}/utxo"
-                elif 'blockcypher' in api['url']:
-                    url = f"{api['url']}/addrs/{address}/balance"
-                elif 'blockchain.info' in api['url']:
-                    url = f"{api['url']}/rawaddr/{address}"
-                elif 'blockchair' in api['url']:
-                    url = f"{api['url']}/dashboards/address/{address}"
-                else:
-                    logger.debug(f"Skipping unsupported blockchain API: {api['url']}")
-                    continue  # Skip unsupported APIs for now
-
-                async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=15)) as session:
-                    secure_logger.log_api_call(url, address)
-                    async with session.get(url) as response:
-                        if response.status == 200:
-                            data = await response.json()
-                            balance = api['parser'](data, address)
-                            logger.debug(f"Balance from {api['name']} for {address}: {balance:.8f} BTC")
-                            return balance
-                        else:
-                            logger.warning(f"HTTP {response.status} from blockchain source {api['name']} for {address}: {response.reason}")
-                            if response.status == 404: # Address not found or invalid
-                                logger.debug(f"Address {address} not found or invalid by {api['name']}.")
-                                continue # Try next API
-
-            except asyncio.TimeoutError:
-                secure_logger.log_error(f"{api['name']} timed out for address {address}", address)
-                continue
-            except aiohttp.ClientConnectorError as e:
-                secure_logger.log_error(f"{api['name']} connection error for address {address}: {e}", address)
-                continue
-            except json.JSONDecodeError:
-                secure_logger.log_error(f"{api['name']} returned invalid JSON for address {address}", address)
-                continue
-            except Exception as e:
-                secure_logger.log_error(f"{api['name']} failed for address {address}: {type(e).__name__} - {str(e)}", address)
-                continue
+        cached = self._balance_cache.get(address)
+        if cached and time.monotonic() < cached[1]:
+            return cached[0]
 
-        logger.error(f"All blockchain APIs failed to check balance for address {address}")
-        return 0.0
+        # Concurrent checks of the same address wait for one lookup
+        async with self._balance_locks[address]:
+            cached = self._balance_cache.get(address)
+            if cached and time.monotonic() < cached[1]:
+                return cached[0]
+
+            balance = await self._query_balance(address)
+            if balance is None:
+                logger.error(f"All blockchain APIs failed to check balance for address {address}")
+                return 0.0
+
+            self._balance_cache[address] = (balance, time.monotonic() + BALANCE_CACHE_TTL)
+            return balance
+
+    def invalidate_balance(self, address: str):
+        """Drop a cached balance once the address is confirmed or handed back"""
+        self._balance_cache.pop(address, None)
+
+    async def check_addresses_bulk(self, addresses: List[str]) -> Dict[str, float]:
+        """Check several address balances concurrently on the shared session"""
+        # Each lookup fans out to every explorer, so bound how many run together
+        addresses = list(dict.fromkeys(addresses))
+        semaphore = asyncio.Semaphore(BULK_BALANCE_CONCURRENCY)
+
+        async def bounded(address: str) -> float:
+            async with semaphore:
+                return await self.check_address_balance(address)
+
+        results = await asyncio.gather(
+            *(bounded(address) for address in addresses),
+            return_exceptions=True
+        )
+        balances = {}
+        for address, result in zip(addresses, results):
+            if isinstance(result, Exception):
+                secure_logger.log_error(f"Bulk balance check failed: {type(result).__name__} - {result}", address)
+                result = 0.0
+            balances[address] = result
+        return balances
+
+    async def _query_balance(self, address: str) -> Optional[float]:
+        """Query every explorer at once and take the first non-zero answer"""
+        session = await self._get_session()
+        tasks = [asyncio.create_task(self._fetch_balance(session, api, address)) for api in self.blockchain_apis]
+        # A lagging explorer reports zero for a fresh payment, so a zero only
+        # stands once no other explorer is left to answer
+        seen_zero = False
+        try:
+            for done in asyncio.as_completed(tasks, timeout=15):
+                balance_sat = await done
+                if balance_sat:
+                    return balance_sat / SATOSHIS_PER_BTC
+                seen_zero = seen_zero or balance_sat == 0
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            for task in tasks:
+                task.cancel()
+        return 0.0 if seen_zero else None
+
+    @staticmethod
+    async def _scan_for_double_spend(response: aiohttp.ClientResponse, address: str, expected_sat: int) -> bool:
+        """True when more than one transaction pays address close to expected_sat"""
+        relevant_tx_count = 0
+        async for tx in _iter_json_array(response):
+            for vout in tx.get('vout', ()):
+                if (vout.get('scriptpubkey_address') == address
+                        and abs(vout.get('value', 0) - expected_sat) < DOUBLE_SPEND_TOLERANCE_SAT):
+                    relevant_tx_count += 1
+                    # A second matching transaction is a strong indicator of double spend
+                    if relevant_tx_count > 1:
+                        return True
+                    break
+        
+        # If only one or no relevant transactions found, assume no double spend
+        return False
 
     async def check_double_spend(self, address: str, expected_amount: float) -> bool:
         """Check for potential double spending by looking for multiple transactions with similar amounts"""
@@ -229,49 +439,36 @@ class BTCPriceAPI:
         try:
             # Using blockstream.info as a primary source for transaction history
             # It's generally reliable and has a clear API for transactions
-            url = f"https://blockstream.info/api/address/{address}/txs"
-
-            async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10)) as session:
-                secure_logger.log_api_call(url, address)
-                async with session.get(url) as response:
-                    if response.status == 200:
-                        txs = await response.json()
-                        
-                        # Count transactions where the address receives an amount close to expected_amount
-                        relevant_tx_count = 0
-                        for tx in txs:
-                            # Check if this transaction is an inbound transaction for the address
-                            is_inbound = False
-                            for vin in tx.get('vin', []):
-                                if vin.get('address') == address:
-                                    # This check might be too simple if the address also sends some amount
-                                    pass # We are primarily interested in outputs to the address
-                            
-                            # Check outputs to the address
-                            for vout in tx.get('vout', []):
-                                if vout.get('scriptpubkey_address') == address:
-                                    amount_satoshis = vout.get('value', 0)
-                                    amount_btc = amount_satoshis / 100000000
-                                    
-                                    # Check if the amount received is close to the expected amount
-                                    # Using a small tolerance to account for potential minor network fees or variations
-                                    if abs(amount_btc - expected_amount) < 0.00001: # Tolerance of 1 satoshi
-                                        relevant_tx_count += 1
-                                        # If we find a second transaction matching, it's a strong indicator of double spend
-                                        if relevant_tx_count > 1:
-                                            logger.warning(f"Potential double spend detected for {address}. Multiple transactions found with amount close to {expected_amount} BTC.")
-                                            return True
-                        
-                        # If only one or no relevant transactions found, assume no double spend
-                        return False
-
-                    elif response.status == 404:
-                        logger.debug(f"No transactions found for address {address} on blockstream.info.")
-                        return False # No transactions means no double spend
-                    else:
-                        logger.warning(f"HTTP {response.status} from blockstream.info for {address}: {response.reason}")
-                        # If the API fails, we can't confirm, so err on the side of caution
-                        return True 
+            url = _BLOCKSTREAM_TXS_URL.format(address)
+            expected_sat = round(expected_amount * SATOSHIS_PER_BTC)
+
+            # Revalidate the last scan with its ETag; an unchanged history returns 304 with no body
+            key = (address, expected_sat)
+            cached = self._tx_etag.get(key)
+            headers = {'If-None-Match': cached[0]} if cached else None
+
+            session = await self._get_session()
+            secure_logger.log_api_call(url, address)
+            async with session.get(url, timeout=_DOUBLESPEND_TIMEOUT, headers=headers) as response:
+                if response.status == 304 and cached:
+                    return cached[1]
+
+                if response.status == 200:
+                    is_double_spend = await self._scan_for_double_spend(response, address, expected_sat)
+                    etag = response.headers.get('ETag')
+                    if etag:
+                        self._tx_etag[key] = (etag, is_double_spend)
+                    if is_double_spend:
+                        logger.warning(f"Potential double spend detected for {address}. Multiple transactions found with amount close to {expected_amount} BTC.")
+                    return is_double_spend
+
+                elif response.status == 404:
+                    logger.debug(f"No transactions found for address {address} on blockstream.info.")
+                    return False # No transactions means no double spend
+                else:
+                    logger.warning(f"HTTP {response.status} from blockstream.info for {address}: {response.reason}")
+                    # If the API fails, we can't confirm, so err on the side of caution
+                    return True 
 
         except asyncio.TimeoutError:
             logger.error(f"Double spend check timed out for address {address}")
@@ -298,6 +495,18 @@ async def check_address_balance(address: str) -> float:
     """Check BTC address balance"""
     return await btc_api.check_address_balance(address)
 
+async def check_addresses_bulk(addresses: List[str]) -> Dict[str, float]:
+    """Check several BTC address balances at once"""
+    return await btc_api.check_addresses_bulk(addresses)
+
+def invalidate_balance(address: str):
+    """Forget the cached balance of a BTC address"""
+    btc_api.invalidate_balance(address)
+
 async def check_double_spend(address: str, expected_amount: float) -> bool:
     """Check for potential double spending"""
-    return await btc_api.check_double_spend(address, expected_amount)
\ No newline at end of file
+    return await btc_api.check_double_spend(address, expected_amount)
+
+async def close_btc_api():
+    """Close the shared HTTP session on shutdown"""
+    await btc_api.aclose()
\ No newline at end of file
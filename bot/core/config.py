@@ -1,47 +1,105 @@
 
 import os
-from typing import List
+from dataclasses import dataclass
+from functools import lru_cache
+from types import MappingProxyType
+from typing import FrozenSet, List, Mapping, Tuple
+
+@dataclass(frozen=True, slots=True)
+class BotConfig:
+    """Bot configuration, read from the environment once"""
 
-class Config:
-    """Bot configuration"""
-    
     # Bot settings
-    BOT_TOKEN = os.getenv("BOT_TOKEN")
-    ADMIN_USER_ID = int(os.getenv("ADMIN_USER_ID", 0))
-    SUPPORT_USERNAME = os.getenv("SUPPORT_USERNAME", "tradecj")
-    
+    BOT_TOKEN: str
+    ADMIN_USER_ID: int
+    SUPPORT_USERNAME: str
+
     # Database
-    DATABASE_URL = os.getenv("DATABASE_URL", "postgresql://localhost/vip_bot")
-    
-    # Bitcoin settings
-    BTC_ADDRESSES = [
-        addr.strip() for addr in os.getenv("BTC_ADDRESSES", "").split(",") 
-        if addr.strip()
-    ]
-    
+    DATABASE_URL: str
+
+    # Bitcoin settings: the set for membership checks, the tuple keeps env order
+    BTC_ADDRESSES: FrozenSet[str]
+    BTC_ADDRESSES_ORDERED: Tuple[str, ...]
+
     # VIP Links - NO HARDCODED VALUES
-    VIP_LINKS = {
-        "VIP1": os.getenv("VIP1_LINK", ""),
-        "VIP2": os.getenv("VIP2_LINK", ""), 
-        "VIP3": os.getenv("VIP3_LINK", "")
-    }
-    
+    VIP_LINKS: Mapping[str, str]
+
     # Payment settings
-    PAYMENT_TIMEOUT_MINUTES = 30
-    PAYMENT_CHECK_INTERVAL_MINUTES = 5
-    
+    PAYMENT_TIMEOUT_MINUTES: int = 30
+    PAYMENT_CHECK_INTERVAL_MINUTES: int = 5
+
+    # Per-process pool sizing; keep DB_POOL_MAX x replicas under Postgres max_connections
+    DB_POOL_MIN: int = 2
+    DB_POOL_MAX: int = 10
+    # Recycling a connection throws away its prepared statements, so retire
+    # connections far less often than asyncpg's 50k default
+    DB_POOL_MAX_QUERIES: int = 500_000
+    DB_POOL_CMD_TIMEOUT: float = 15.0
+    DB_POOL_MAX_IDLE: float = 300.0
+
+    # Admin: how long the force-actions list is redrawn from memory after approve/reject
+    ADMIN_PENDING_CACHE_TTL: int = 30
+
     @classmethod
-    def validate(cls) -> List[str]:
+    @lru_cache(maxsize=1)
+    def load(cls) -> "BotConfig":
+        """Build the configuration from environment variables"""
+        btc_addresses = tuple(
+            addr.strip() for addr in os.getenv("BTC_ADDRESSES", "").split(",")
+            if addr.strip()
+        )
+        return cls(
+            BOT_TOKEN=os.getenv("BOT_TOKEN"),
+            ADMIN_USER_ID=int(os.getenv("ADMIN_USER_ID") or 0),
+            SUPPORT_USERNAME=os.getenv("SUPPORT_USERNAME", "tradecj"),
+            DATABASE_URL=os.getenv("DATABASE_URL", "postgresql://localhost/vip_bot"),
+            BTC_ADDRESSES=frozenset(btc_addresses),
+            BTC_ADDRESSES_ORDERED=btc_addresses,
+            VIP_LINKS=MappingProxyType({
+                "VIP1": os.getenv("VIP1_LINK", ""),
+                "VIP2": os.getenv("VIP2_LINK", ""),
+                "VIP3": os.getenv("VIP3_LINK", "")
+            }),
+            DB_POOL_MIN=int(os.getenv("DB_POOL_MIN", "2")),
+            DB_POOL_MAX=int(os.getenv("DB_POOL_MAX", "10")),
+            DB_POOL_MAX_QUERIES=int(os.getenv("DB_POOL_MAX_QUERIES", "500000")),
+            DB_POOL_CMD_TIMEOUT=float(os.getenv("DB_POOL_CMD_TIMEOUT", "15")),
+            DB_POOL_MAX_IDLE=float(os.getenv("DB_POOL_MAX_IDLE", "300")),
+            ADMIN_PENDING_CACHE_TTL=int(os.getenv("ADMIN_PENDING_CACHE_TTL", "30"))
+        )
+
+    def validate(self) -> List[str]:
         """Validate configuration and return errors"""
         errors = []
-        
-        if not cls.BOT_TOKEN:
+
+        if not self.BOT_TOKEN:
             errors.append("BOT_TOKEN is required")
-            
-        if not cls.ADMIN_USER_ID:
+
+        if not self.ADMIN_USER_ID:
             errors.append("ADMIN_USER_ID is required")
-            
-        if not cls.BTC_ADDRESSES:
+
+        if not self.BTC_ADDRESSES:
             errors.append("BTC_ADDRESSES is required")
-            
+
+        errors.extend(self.validate_pool())
+        return errors
+
+    def validate_pool(self) -> List[str]:
+        """Validate the database pool settings and return errors"""
+        errors = []
+
+        if self.DB_POOL_MIN < 0 or self.DB_POOL_MAX < 1:
+            errors.append("DB_POOL_MIN must be >= 0 and DB_POOL_MAX >= 1")
+        elif self.DB_POOL_MIN > self.DB_POOL_MAX:
+            errors.append("DB_POOL_MIN must not exceed DB_POOL_MAX")
+
+        if self.DB_POOL_MAX_QUERIES < 1:
+            errors.append("DB_POOL_MAX_QUERIES must be positive")
+
+        if self.DB_POOL_CMD_TIMEOUT <= 0 or self.DB_POOL_MAX_IDLE < 0:
+            errors.append("DB_POOL_CMD_TIMEOUT must be positive and DB_POOL_MAX_IDLE non-negative")
+
         return errors
+
+# Existing callers keep using Config.X attribute access
+Config = BotConfig.load()
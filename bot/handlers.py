@@ -1,16 +1,94 @@
+import asyncio
+import hashlib
 import logging
-import os
-from datetime import datetime, timedelta
+import time
+from typing import Dict, Tuple
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
-from bot.models import PlanType, get_plan_configs
-from bot.btc_api import get_btc_price, check_address_balance
-from bot.utils import format_time_remaining, format_btc_amount
+from bot.models import PlanType, PLAN_CFG_BY_STR, PLAN_CONFIG_LIST, validate_plan_type
+from bot.btc_api import get_btc_price, check_address_balance, invalidate_balance
+from bot.utils import format_time_remaining, format_btc_amount, utc_now
 from bot.core.config import Config
 from bot.services.payment_service import PaymentService
+from bot.admin import handle_admin_callback
 import database
 
 logger = logging.getLogger(__name__)
 
+# (epoch second, "HH:MM:SS") of the last formatted UTC timestamp
+_TS_CACHE = [0, '']
+
+def _utc_hms() -> str:
+    """Current UTC time as HH:MM:SS, formatted at most once per second"""
+    now = int(time.time())
+    if now != _TS_CACHE[0]:
+        _TS_CACHE[:] = [now, time.strftime('%H:%M:%S', time.gmtime(now))]
+    return _TS_CACHE[1]
+
+_STATUS_EMOJI = {"pending": "⏳", "confirmed": "✅", "expired": "❌", "cancelled": "🚫"}
+
+# Message skeletons, parsed once and filled with str.format per render
+_DASH_ACTIVE_TMPL = "✅ Active Subscription:\nPlan: {emoji} {name}\nStatus: Active\nExpires: {expires}\n"
+_DASH_TX_ROW_TMPL = (
+    "\n{i}. {emoji} {plan}\n"
+    "   Amount: {btc} BTC (${usd:.2f})\n"
+    "   Status: {semoji} {sstatus}\n"
+    "   Date: {date:%Y-%m-%d %H:%M}\n"
+)
+_PAYMENT_DETAILS_TMPL = (
+    "💳 **Payment Required**\n\n"
+    "Plan: {emoji} {name}\n"
+    "Amount: {btc} BTC (${usd:.2f})\n"
+    "BTC Rate: ${rate:,.2f}\n\n"
+    "Send exactly **{btc} BTC** to:\n\n"
+    "`{address}`\n\n"
+    "⏰ Expires in {timeout} minutes\n"
+    "💡 *Tap and hold the address above to copy, or use the Copy button below*\n"
+    "Payment will be automatically detected."
+)
+
+# Static keyboards are built once at import time
+MAIN_MENU_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("📊 Compare Plans", callback_data="compare_plans")],
+    [InlineKeyboardButton("💼 Dashboard", callback_data="dashboard")],
+    [InlineKeyboardButton("❌ Cancel Plan", callback_data="cancel_plan")],
+    [InlineKeyboardButton("🆘 Support", callback_data="support")]
+])
+
+BACK_ROW = [InlineKeyboardButton("⬅ Back", callback_data="back_to_main")]
+BACK_TO_MAIN_MARKUP = InlineKeyboardMarkup([BACK_ROW])
+BACK_TO_PLANS_MARKUP = InlineKeyboardMarkup([[InlineKeyboardButton("⬅ Back", callback_data="compare_plans")]])
+DASHBOARD_BUTTON_MARKUP = InlineKeyboardMarkup([[InlineKeyboardButton("💼 Dashboard", callback_data="dashboard")]])
+
+# Plan names and prices are static, so the comparison screen is built once
+def _build_compare_plans():
+    lines = ["🎯 **Choose Your VIP Plan:**\n\n"]
+    keyboard = []
+    for _, config, callback_data in PLAN_CONFIG_LIST:
+        duration = "Lifetime" if config["duration_days"] is None else f"{config['duration_days']} days"
+        lines.append(f"{config['emoji']} **{config['name']}**: ${config['price_usd']} / {duration}\n")
+        keyboard.append([InlineKeyboardButton(f"💳 Buy {config['name']} {config['emoji']}", callback_data=callback_data)])
+    keyboard.append(BACK_ROW)
+    return "".join(lines), InlineKeyboardMarkup(keyboard)
+
+COMPARE_PLANS_TEXT, COMPARE_PLANS_MARKUP = _build_compare_plans()
+
+DASHBOARD_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("🔄 Refresh", callback_data="refresh")],
+    [InlineKeyboardButton("📌 View Pending", callback_data="view_pending")],
+    BACK_ROW
+])
+
+# Env-derived values come from Config, which reads the environment once
+ADMIN_REQUEST_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("💬 Contact Admin", url=f"https://t.me/{Config.SUPPORT_USERNAME}")],
+    [InlineKeyboardButton("⬅ Back", callback_data="dashboard")]
+])
+
+SUPPORT_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("💬 Chat with Support", url="https://t.me/Tradcj")],
+    BACK_ROW
+])
+
 async def handle_start(update, context):
     """Handle /start command"""
     user = update.effective_user
@@ -21,18 +99,10 @@ async def handle_start(update, context):
 
     welcome_text = f"Hello {user.first_name} 👋\nWelcome to our VIP service."
 
-    keyboard = [
-        [InlineKeyboardButton("📊 Compare Plans", callback_data="compare_plans")],
-        [InlineKeyboardButton("💼 Dashboard", callback_data="dashboard")],
-        [InlineKeyboardButton("❌ Cancel Plan", callback_data="cancel_plan")],
-        [InlineKeyboardButton("🆘 Support", callback_data="support")]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-
     await context.bot.send_message(
         chat_id=chat_id,
         text=welcome_text,
-        reply_markup=reply_markup
+        reply_markup=MAIN_MENU_MARKUP
     )
 
 async def handle_callback(update, context):
@@ -41,156 +111,140 @@ async def handle_callback(update, context):
     await query.answer()
 
     data = query.data
-    user_id = query.from_user.id
 
-    # Admin callbacks
-    if data.startswith("admin_") or data.startswith("force_"):
-        from bot.admin import handle_admin_callback
-        await handle_admin_callback(query, context)
-        return
+    # Exact callbacks first, then parameterised ones by their first token
+    handler = _CALLBACKS.get(data) or _PREFIX_CALLBACKS.get(data.partition("_")[0])
+    if handler:
+        await handler(query, context)
 
-    # Regular user callbacks
-    if data == "compare_plans":
-        await show_compare_plans(query, context)
-    elif data == "dashboard":
-        await show_dashboard(query, context)
-    elif data == "cancel_plan":
-        await cancel_plan(query, context)
-    elif data == "support":
-        await show_support(query, context)
-    elif data.startswith("buy_"):
-        plan_type = data.split("_")[1].upper()
-        await initiate_purchase(query, context, PlanType(plan_type))
-    elif data == "view_pending":
-        await view_pending_transaction(query, context)
-    elif data == "back_to_main":
-        await back_to_main(query, context)
-    elif data == "request_admin_access":
-        await request_admin_access(query, context)
-    elif data == "refresh":
-        await handle_refresh(query, context) # Handle refresh callback
-    elif data.startswith("copy_address_"):
-        await handle_copy_address(query, context)
+async def handle_buy(query, context):
+    """Start a purchase for the plan named in buy_<plan>"""
+    plan_type = validate_plan_type(query.data.partition("_")[2])
+    if plan_type is None:
+        await query.answer("❌ Unknown plan", show_alert=True)
+        return
+    await initiate_purchase(query, context, plan_type)
 
 async def show_compare_plans(query, context):
     """Show plan comparison"""
-    plans_text = "🎯 **Choose Your VIP Plan:**\n\n"
-
-    for plan_type, config in get_plan_configs().items():
-        duration = "Lifetime" if config["duration_days"] is None else f"{config['duration_days']} days"
-        plans_text += f"{config['emoji']} **{config['name']}**: ${config['price_usd']} / {duration}\n"
-
-    keyboard = []
-    for plan_type, config in get_plan_configs().items():
-        keyboard.append([InlineKeyboardButton(f"💳 Buy {config['name']} {config['emoji']}", callback_data=f"buy_{plan_type.name.lower()}")])
-
-    keyboard.append([InlineKeyboardButton("⬅ Back", callback_data="back_to_main")])
-    reply_markup = InlineKeyboardMarkup(keyboard)
-
     await query.edit_message_text(
-        text=plans_text,
-        reply_markup=reply_markup,
+        text=COMPARE_PLANS_TEXT,
+        reply_markup=COMPARE_PLANS_MARKUP,
         parse_mode='Markdown'
     )
 
+def _already_shown(query, context, key: str, heading: str, body: str) -> bool:
+    """Return True when this message already shows body under heading, else remember it"""
+    digest = hashlib.blake2s(body.encode(), digest_size=8).digest()
+    message = query.message
+    mark = (message.message_id, digest)
+    # The heading check catches the same message having moved to another screen since
+    if context.user_data.get(key) == mark and (message.text or "").startswith(heading):
+        return True
+    context.user_data[key] = mark
+    return False
+
 async def show_dashboard(query, context):
     """Show user dashboard"""
     user_id = query.from_user.id
 
-    # Get active subscription
-    active_sub = await database.get_active_subscription(user_id)
-
-    # Get user transactions
-    transactions = await database.get_user_transactions(user_id)
+    # Active subscription and transactions are independent lookups
+    active_sub, transactions = await asyncio.gather(
+        database.get_active_subscription(user_id),
+        database.get_recent_transactions(user_id, 3)
+    )
 
-    # Add timestamp to prevent "not modified" errors
-    current_time = datetime.utcnow().strftime('%H:%M:%S')
-    dashboard_text = f"💼 Your Dashboard (Updated: {current_time})\n\n"
+    # The Updated stamp is prepended after hashing so it never defeats the check
+    parts = []
 
     if active_sub:
-        plan_config = get_plan_configs()[PlanType(active_sub['plan_type'])]
+        plan_config = PLAN_CFG_BY_STR[active_sub['plan_type']]
         vip_link = Config.VIP_LINKS.get(active_sub['plan_type'], "")
 
-        dashboard_text += f"✅ Active Subscription:\n"
-        dashboard_text += f"Plan: {plan_config['emoji']} {plan_config['name']}\n"
-        dashboard_text += f"Status: Active\n"
-
-        if active_sub['expires_at']:
-            dashboard_text += f"Expires: {active_sub['expires_at'].strftime('%Y-%m-%d %H:%M')}\n"
-        else:
-            dashboard_text += f"Expires: Never (Lifetime)\n"
+        expires_at = active_sub['expires_at']
+        parts.append(_DASH_ACTIVE_TMPL.format(
+            emoji=plan_config['emoji'],
+            name=plan_config['name'],
+            expires=expires_at.strftime('%Y-%m-%d %H:%M') if expires_at else "Never (Lifetime)"
+        ))
 
         if vip_link:
-            dashboard_text += f"\n🔗 Your VIP Access: {vip_link}\n"
+            parts.append(f"\n🔗 Your VIP Access: {vip_link}\n")
     else:
-        dashboard_text += "❌ No Active Subscription\n"
+        parts.append("❌ No Active Subscription\n")
 
-    dashboard_text += "\n📊 Recent Transactions:\n"
+    parts.append("\n📊 Recent Transactions:\n")
 
     if transactions:
-        for i, tx in enumerate(transactions[:3]):
-            plan_config = get_plan_configs()[PlanType(tx['plan_type'])]
-            status_emoji = {"pending": "⏳", "confirmed": "✅", "expired": "❌", "cancelled": "🚫"}
-
-            dashboard_text += f"\n{i+1}. {plan_config['emoji']} {tx['plan_type']}\n"
-            dashboard_text += f"   Amount: {format_btc_amount(float(tx['btc_amount']))} BTC (${float(tx['usd_amount']):.2f})\n"
-            dashboard_text += f"   Status: {status_emoji.get(tx['status'], '❓')} {tx['status'].title()}\n"
-            dashboard_text += f"   Date: {tx['created_at'].strftime('%Y-%m-%d %H:%M')}\n"
+        plan_cfgs, status_emoji, row_fmt = PLAN_CFG_BY_STR, _STATUS_EMOJI, _DASH_TX_ROW_TMPL.format
+        for i, tx in enumerate(transactions, 1):
+            status = tx['status']
+            parts.append(row_fmt(
+                i=i,
+                emoji=plan_cfgs[tx['plan_type']]['emoji'],
+                plan=tx['plan_type'],
+                btc=format_btc_amount(tx['btc_amount']),
+                usd=tx['usd_amount'],
+                semoji=status_emoji.get(status, '❓'),
+                sstatus=status.title(),
+                date=tx['created_at']
+            ))
     else:
-        dashboard_text += "No transactions found.\n"
+        parts.append("No transactions found.\n")
 
-    keyboard = [
-        [InlineKeyboardButton("🔄 Refresh", callback_data="refresh")], # Changed callback_data to "refresh"
-        [InlineKeyboardButton("📌 View Pending", callback_data="view_pending")],
-        [InlineKeyboardButton("⬅ Back", callback_data="back_to_main")]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    body = "".join(parts)
+    if _already_shown(query, context, '_dashboard_hash', "💼 Your Dashboard", body):
+        await query.answer("Dashboard is already up to date.", show_alert=False)
+        return
+
+    dashboard_text = f"💼 Your Dashboard (Updated: {_utc_hms()})\n\n{body}"
 
     try:
         await query.edit_message_text(
             text=dashboard_text,
-            reply_markup=reply_markup
+            reply_markup=DASHBOARD_MARKUP
         )
     except Exception as e:
         if "not modified" in str(e).lower():
             await query.answer("Dashboard is already up to date.", show_alert=False)
         else:
+            # Nothing was shown, so the next refresh must not be skipped
+            context.user_data.pop('_dashboard_hash', None)
             logger.error(f"Error updating dashboard: {e}")
 
 async def cancel_plan(query, context):
     """Cancel pending transactions"""
     user_id = query.from_user.id
 
-    transactions = await database.get_user_transactions(user_id)
-    pending_transactions = [tx for tx in transactions if tx['status'] == 'pending']
+    pending_transactions = await database.get_user_pending_transactions(user_id)
 
     if not pending_transactions:
-        keyboard = [[InlineKeyboardButton("⬅ Back", callback_data="back_to_main")]]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-
         await query.edit_message_text(
             text="❌ No pending transactions to cancel.",
-            reply_markup=reply_markup
+            reply_markup=BACK_TO_MAIN_MARKUP
         )
         return
 
-    # Release addresses and cancel transactions
-    for tx in pending_transactions:
-        try:
-            balance = await check_address_balance(tx['btc_address'])
-            if balance == 0:
-                await database.release_btc_address(tx['btc_address'])
-        except Exception as e:
-            logger.error(f"Error checking address balance: {e}")
+    # Check every address at once, then release the unfunded ones and cancel all
+    balances = await asyncio.gather(
+        *(check_address_balance(tx['btc_address']) for tx in pending_transactions),
+        return_exceptions=True
+    )
 
-        await database.update_transaction_status(tx['id'], 'cancelled')
+    updates = []
+    for tx, balance in zip(pending_transactions, balances):
+        if isinstance(balance, Exception):
+            logger.error(f"Error checking address balance: {balance}")
+        elif balance == 0:
+            updates.append(database.release_btc_address(tx['btc_address']))
+            invalidate_balance(tx['btc_address'])
+        updates.append(database.update_transaction_status(tx['id'], 'cancelled'))
 
-    keyboard = [[InlineKeyboardButton("⬅ Back", callback_data="back_to_main")]]
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    await asyncio.gather(*updates)
 
     await query.edit_message_text(
         text="✅ All pending transactions have been cancelled.",
-        reply_markup=reply_markup
+        reply_markup=BACK_TO_MAIN_MARKUP
     )
 
 async def show_support(query, context):
@@ -200,15 +254,9 @@ async def show_support(query, context):
     support_text += "@Tradcj\n\n"
     support_text += "Click the button below to start a chat."
 
-    keyboard = [
-        [InlineKeyboardButton("💬 Chat with Support", url="https://t.me/Tradcj")],
-        [InlineKeyboardButton("⬅ Back", callback_data="back_to_main")]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-
     await query.edit_message_text(
         text=support_text,
-        reply_markup=reply_markup,
+        reply_markup=SUPPORT_MARKUP,
         parse_mode='Markdown'
     )
 
@@ -217,84 +265,90 @@ async def initiate_purchase(query, context, plan_type: PlanType):
     user = query.from_user
     user_id = user.id
 
-    # Ensure user exists in database first
-    await database.create_user(user_id, user.username, user.first_name)
-
-    # Get current BTC price
-    btc_price = await get_btc_price()
+    # Upsert the user, fetch the (usually cached) BTC price and look up existing
+    # subscription/pending state together; each runs on its own pool connection
+    _, btc_price, active_subscription, pending_tx = await asyncio.gather(
+        database.create_user(user_id, user.username, user.first_name),
+        get_btc_price(),
+        database.get_active_subscription(user_id),
+        database.get_pending_transaction(user_id)
+    )
     if not btc_price:
-        keyboard = [[InlineKeyboardButton("⬅ Back", callback_data="compare_plans")]]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-
         await query.edit_message_text(
             text="❌ Unable to fetch BTC price. Please try again later.",
-            reply_markup=reply_markup
+            reply_markup=BACK_TO_PLANS_MARKUP
         )
         return
 
     # Check if user already has active subscription for this plan
-    active_subscription = await database.get_active_subscription(user_id)
     if active_subscription and active_subscription['plan_type'] == plan_type:
         await query.edit_message_text(
             text=f"❌ You already have an active {plan_type} subscription!",
-            reply_markup=InlineKeyboardMarkup([[
-                InlineKeyboardButton("💼 Dashboard", callback_data="dashboard")
-            ]])
+            reply_markup=DASHBOARD_BUTTON_MARKUP
         )
         return
 
     # Check if user has pending transaction for this plan
-    pending_tx = await database.get_pending_transaction(user_id)
     if pending_tx and pending_tx['plan_type'] == plan_type:
         # Show existing pending transaction
         await show_payment_details(query, context, pending_tx)
         return
     elif pending_tx:
         # Cancel old pending transaction for different plan
-        await database.update_transaction_status(pending_tx['id'], 'cancelled')
-        await database.release_btc_address(pending_tx['btc_address'])
+        await asyncio.gather(
+            database.update_transaction_status(pending_tx['id'], 'cancelled'),
+            database.release_btc_address(pending_tx['btc_address'])
+        )
+        invalidate_balance(pending_tx['btc_address'])
 
     # Create payment using service
     payment = await PaymentService.create_payment(user_id, plan_type, btc_price)
     if not payment:
         await query.edit_message_text(
             text="❌ Unable to create payment. You may already have an active subscription or no addresses available.",
-            reply_markup=InlineKeyboardMarkup([[
-                InlineKeyboardButton("⬅ Back", callback_data="compare_plans")
-            ]])
+            reply_markup=BACK_TO_PLANS_MARKUP
         )
         return
 
     # Show payment details
     await show_payment_details(query, context, payment)
 
+async def _get_pending_tx(context, user_id: int):
+    """Fetch the user's newest pending transaction with its BTC amount pre-formatted"""
+    tx = await database.get_pending_transaction(user_id)
+    if tx:
+        # The amount never changes for a transaction, so format it once per tx id
+        cached = context.user_data.get('_pending_btc_str')
+        if cached and cached[0] == tx['id']:
+            tx['_btc_str'] = cached[1]
+        else:
+            tx['_btc_str'] = format_btc_amount(tx['btc_amount'])
+            context.user_data['_pending_btc_str'] = (tx['id'], tx['_btc_str'])
+    return tx
+
 async def view_pending_transaction(query, context):
     """Show pending transaction details"""
     user_id = query.from_user.id
 
-    transactions = await database.get_user_transactions(user_id)
-    pending_transactions = [tx for tx in transactions if tx['status'] == 'pending']
-
-    current_time = datetime.utcnow().strftime('%H:%M:%S')
+    # Only the newest pending transaction is shown
+    tx = await _get_pending_tx(context, user_id)
 
-    if not pending_transactions:
-        keyboard = [[InlineKeyboardButton("⬅ Back", callback_data="back_to_main")]]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+    current_time = _utc_hms()
 
+    if not tx:
         try:
             await query.edit_message_text(
                 text=f"❌ No pending transactions found. (Updated: {current_time})",
-                reply_markup=reply_markup
+                reply_markup=BACK_TO_MAIN_MARKUP
             )
         except Exception as e:
             if "not modified" not in str(e).lower():
                 logger.error(f"Error updating pending view: {e}")
         return
 
-    tx = pending_transactions[0]
-    plan_config = get_plan_configs()[PlanType(tx['plan_type'])]
+    plan_config = PLAN_CFG_BY_STR[tx['plan_type']]
 
-    time_left = tx['expires_at'] - datetime.utcnow()
+    time_left = tx['expires_at'] - utc_now()
 
     if time_left.total_seconds() <= 0:
         status_text = "❌ Expired"
@@ -303,20 +357,26 @@ async def view_pending_transaction(query, context):
         status_text = "⏳ Pending Confirmation"
         time_text = f"Time Left: {format_time_remaining(time_left)}"
 
-    pending_text = f"📌 **Pending Transaction** (Updated: {current_time})\n\n"
-    pending_text += f"Plan: {plan_config['emoji']} {plan_config['name']}\n"
-    pending_text += f"Amount: **{format_btc_amount(float(tx['btc_amount']))} BTC**\n"
-    pending_text += f"Address:\n`{tx['btc_address']}`\n\n"
-    pending_text += f"Status: {status_text}\n"
-    pending_text += f"{time_text}\n\n"
-    pending_text += f"💡 *Tap and hold the address above to copy, or use the Copy button below*\n"
-    pending_text += f"Created: {tx['created_at'].strftime('%Y-%m-%d %H:%M')}"
+    body = "".join((
+        f"Plan: {plan_config['emoji']} {plan_config['name']}\n",
+        f"Amount: **{tx['_btc_str']} BTC**\n",
+        f"Address:\n`{tx['btc_address']}`\n\n",
+        f"Status: {status_text}\n",
+        f"{time_text}\n\n",
+        "💡 *Tap and hold the address above to copy, or use the Copy button below*\n",
+        f"Created: {tx['created_at'].strftime('%Y-%m-%d %H:%M')}"
+    ))
+    if _already_shown(query, context, '_pending_hash', "📌 Pending Transaction", body):
+        await query.answer("Transaction status is up to date.", show_alert=False)
+        return
+
+    pending_text = f"📌 **Pending Transaction** (Updated: {current_time})\n\n{body}"
 
     keyboard = [
         [InlineKeyboardButton("📋 Copy Address", callback_data=f"copy_address_{tx['id']}")],
         [InlineKeyboardButton("🔄 Refresh", callback_data="view_pending")],
         [InlineKeyboardButton("❌ Cancel Transaction", callback_data="cancel_plan")],
-        [InlineKeyboardButton("⬅ Back", callback_data="back_to_main")]
+        BACK_ROW
     ]
     reply_markup = InlineKeyboardMarkup(keyboard)
 
@@ -330,35 +390,34 @@ async def view_pending_transaction(query, context):
         if "not modified" in str(e).lower():
             await query.answer("Transaction status is up to date.", show_alert=False)
         else:
+            # Nothing was shown, so the next refresh must not be skipped
+            context.user_data.pop('_pending_hash', None)
             logger.error(f"Error updating pending transaction: {e}")
 
 async def request_admin_access(query, context):
     """Handle admin access request"""
     user = query.from_user
-    admin_id = int(os.getenv("ADMIN_USER_ID", 0))
-
-    request_text = "🔐 **Admin Access Request**\n\n"
-    request_text += "To become an admin and control signals in groups, you must meet these requirements:\n\n"
-    request_text += "✅ Have more than $5,000 USD in your trading account\n"
-    request_text += "✅ Have 3+ years of trading experience\n\n"
-    request_text += "Please contact our admin with your achievements, trading experience, and what you can offer to the community."
 
-    keyboard = [
-        [InlineKeyboardButton("💬 Contact Admin", url=f"https://t.me/{os.getenv('SUPPORT_USERNAME', 'tradecj')}")],
-        [InlineKeyboardButton("⬅ Back", callback_data="dashboard")]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    request_text = (
+        "🔐 **Admin Access Request**\n\n"
+        "To become an admin and control signals in groups, you must meet these requirements:\n\n"
+        "✅ Have more than $5,000 USD in your trading account\n"
+        "✅ Have 3+ years of trading experience\n\n"
+        "Please contact our admin with your achievements, trading experience, and what you can offer to the community."
+    )
 
     # Also notify admin about the request
     try:
-        admin_notification = f"🔔 **New Admin Access Request**\n\n"
-        admin_notification += f"User: {user.first_name} {user.last_name or ''}\n"
-        admin_notification += f"Username: @{user.username or 'no_username'}\n"
-        admin_notification += f"User ID: {user.id}\n"
-        admin_notification += f"Requested at: {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')}"
+        admin_notification = "".join((
+            "🔔 **New Admin Access Request**\n\n",
+            f"User: {user.first_name} {user.last_name or ''}\n",
+            f"Username: @{user.username or 'no_username'}\n",
+            f"User ID: {user.id}\n",
+            f"Requested at: {utc_now().strftime('%Y-%m-%d %H:%M:%S')}"
+        ))
 
         await context.bot.send_message(
-            chat_id=admin_id,
+            chat_id=Config.ADMIN_USER_ID,
             text=admin_notification,
             parse_mode='Markdown'
         )
@@ -367,7 +426,7 @@ async def request_admin_access(query, context):
 
     await query.edit_message_text(
         text=request_text,
-        reply_markup=reply_markup,
+        reply_markup=ADMIN_REQUEST_MARKUP,
         parse_mode='Markdown'
     )
 
@@ -376,23 +435,26 @@ async def back_to_main(query, context):
     user = query.from_user
     welcome_text = f"Hello {user.first_name} 👋\nWelcome to our VIP service."
 
-    keyboard = [
-        [InlineKeyboardButton("📊 Compare Plans", callback_data="compare_plans")],
-        [InlineKeyboardButton("💼 Dashboard", callback_data="dashboard")],
-        [InlineKeyboardButton("❌ Cancel Plan", callback_data="cancel_plan")],
-        [InlineKeyboardButton("🆘 Support", callback_data="support")]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-
     await query.edit_message_text(
         text=welcome_text,
-        reply_markup=reply_markup
+        reply_markup=MAIN_MENU_MARKUP
     )
 
+# Refresh renders in progress, keyed by (user_id, callback data)
+_INFLIGHT: Dict[Tuple[int, str], asyncio.Task] = {}
+
 async def handle_refresh(query, context):
+    """Handle refresh button, coalescing repeated clicks onto the render in flight"""
+    key = (query.from_user.id, query.data)
+    task = _INFLIGHT.get(key)
+    if task is None:
+        task = asyncio.create_task(_refresh(query, context))
+        _INFLIGHT[key] = task
+        task.add_done_callback(lambda _: _INFLIGHT.pop(key, None))
+    await asyncio.shield(task)
+
+async def _refresh(query, context):
     """Handle refresh button for both user and admin"""
-    user_id = query.from_user.id
-
     try:
         if query.data == 'refresh':
             # User refresh - show dashboard
@@ -414,73 +476,17 @@ async def handle_refresh(query, context):
             logger.error(f"Refresh error: {e}")
             await query.answer("❌ Refresh failed", show_alert=True)
 
-async def initiate_purchase(query, context, plan_type: PlanType):
-    """Initiate purchase process"""
-    user = query.from_user
-    user_id = user.id
-
-    # Ensure user exists in database first
-    await database.create_user(user_id, user.username, user.first_name)
-
-    # Get current BTC price
-    btc_price = await get_btc_price()
-    if not btc_price:
-        keyboard = [[InlineKeyboardButton("⬅ Back", callback_data="compare_plans")]]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-
-        await query.edit_message_text(
-            text="❌ Unable to fetch BTC price. Please try again later.",
-            reply_markup=reply_markup
-        )
-        return
-
-    # Check if user already has active subscription for this plan
-    active_subscription = await database.get_active_subscription(user_id)
-    if active_subscription and active_subscription['plan_type'] == plan_type:
-        await query.edit_message_text(
-            text=f"❌ You already have an active {plan_type} subscription!",
-            reply_markup=InlineKeyboardMarkup([[
-                InlineKeyboardButton("💼 Dashboard", callback_data="dashboard")
-            ]])
-        )
-        return
-
-    # Check if user has pending transaction for this plan
-    pending_tx = await database.get_pending_transaction(user_id)
-    if pending_tx and pending_tx['plan_type'] == plan_type:
-        # Show existing pending transaction
-        await show_payment_details(query, context, pending_tx)
-        return
-    elif pending_tx:
-        # Cancel old pending transaction for different plan
-        await database.update_transaction_status(pending_tx['id'], 'cancelled')
-        await database.release_btc_address(pending_tx['btc_address'])
-
-    # Create payment using service
-    payment = await PaymentService.create_payment(user_id, plan_type, btc_price)
-    if not payment:
-        await query.edit_message_text(
-            text="❌ Unable to create payment. You may already have an active subscription or no addresses available.",
-            reply_markup=InlineKeyboardMarkup([[
-                InlineKeyboardButton("⬅ Back", callback_data="compare_plans")
-            ]])
-        )
-        return
-
-    # Show payment details
-    await show_payment_details(query, context, payment)
-
 async def handle_copy_address(query, context):
     """Handle copy address button click"""
     try:
-        transaction_id = int(query.data.split("_")[2])
-        transaction = await database.get_transaction(transaction_id)
+        transaction_id = int(query.data.rpartition("_")[2])
+        btc_address = await database.get_transaction_address(transaction_id)
         
-        if transaction:
+        if btc_address:
             # Send the address as a separate message for easy copying
             await context.bot.send_message(
                 chat_id=query.from_user.id,
-                text=f"📋 **Copy this address:**\n\n`{transaction['btc_address']}`\n\n💡 *Tap and hold the address above to copy it*",
+                text=f"📋 **Copy this address:**\n\n`{btc_address}`\n\n💡 *Tap and hold the address above to copy it*",
                 parse_mode='Markdown'
             )
             await query.answer("Address sent below - tap and hold to copy!", show_alert=False)
@@ -492,17 +498,17 @@ async def handle_copy_address(query, context):
 
 async def show_payment_details(query, context, payment):
     """Show payment details to the user"""
-    plan_config = get_plan_configs()[PlanType(payment['plan_type'])]
-
-    payment_text = f"💳 **Payment Required**\n\n"
-    payment_text += f"Plan: {plan_config['emoji']} {plan_config['name']}\n"
-    payment_text += f"Amount: {format_btc_amount(payment['btc_amount'])} BTC (${payment['usd_amount']:.2f})\n"
-    payment_text += f"BTC Rate: ${payment['btc_price']:,.2f}\n\n"
-    payment_text += f"Send exactly **{format_btc_amount(payment['btc_amount'])} BTC** to:\n\n"
-    payment_text += f"`{payment['btc_address']}`\n\n"
-    payment_text += f"⏰ Expires in {Config.PAYMENT_TIMEOUT_MINUTES} minutes\n"
-    payment_text += f"💡 *Tap and hold the address above to copy, or use the Copy button below*\n"
-    payment_text += f"Payment will be automatically detected."
+    plan_config = PLAN_CFG_BY_STR[payment['plan_type']]
+
+    payment_text = _PAYMENT_DETAILS_TMPL.format(
+        emoji=plan_config['emoji'],
+        name=plan_config['name'],
+        btc=format_btc_amount(payment['btc_amount']),
+        usd=payment['usd_amount'],
+        rate=payment['btc_price'],
+        address=payment['btc_address'],
+        timeout=Config.PAYMENT_TIMEOUT_MINUTES
+    )
 
     keyboard = [
         [InlineKeyboardButton("📋 Copy Address", callback_data=f"copy_address_{payment['id']}")],
@@ -515,4 +521,23 @@ async def show_payment_details(query, context, payment):
         text=payment_text,
         reply_markup=reply_markup,
         parse_mode='Markdown'
-    )
\ No newline at end of file
+    )
+
+# Callback dispatch tables, defined after the handlers they reference
+_CALLBACKS = {
+    "compare_plans": show_compare_plans,
+    "dashboard": show_dashboard,
+    "cancel_plan": cancel_plan,
+    "support": show_support,
+    "view_pending": view_pending_transaction,
+    "back_to_main": back_to_main,
+    "request_admin_access": request_admin_access,
+    "refresh": handle_refresh
+}
+
+_PREFIX_CALLBACKS = {
+    "admin": handle_admin_callback,
+    "force": handle_admin_callback,
+    "buy": handle_buy,
+    "copy": handle_copy_address
+}
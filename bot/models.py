@@ -1,5 +1,7 @@
 from enum import Enum
-from typing import Dict, Any, Optional
+from functools import lru_cache
+from typing import Dict, Any, Optional, Tuple
+from bot.core.config import Config
 
 class PlanType(Enum):
     """VIP Plan types"""
@@ -20,10 +22,9 @@ class SubscriptionStatus(Enum):
     EXPIRED = "expired"
     CANCELLED = "cancelled"
 
+@lru_cache(maxsize=1)
 def get_plan_configs() -> Dict[PlanType, Dict[str, Any]]:
-    """Get plan configurations with links from environment"""
-    from bot.core.config import Config
-    
+    """Get plan configurations with links from environment, built once"""
     return {
         PlanType.VIP1: {
             "name": "VIP1 Plan",
@@ -70,9 +71,18 @@ def get_plan_configs() -> Dict[PlanType, Dict[str, Any]]:
         }
     }
 
-# Dynamic plan configs
+# Same mapping get_plan_configs() returns
 PLAN_CONFIGS = get_plan_configs()
 
+# Plan configs keyed by the raw plan_type string stored in the database,
+# so callers holding a string never need to construct a PlanType
+PLAN_CFG_BY_STR: Dict[str, Dict[str, Any]] = {pt.value: cfg for pt, cfg in PLAN_CONFIGS.items()}
+
+# (plan type, config, buy callback data) in display order
+PLAN_CONFIG_LIST: Tuple[Tuple[PlanType, Dict[str, Any], str], ...] = tuple(
+    (pt, cfg, f"buy_{pt.name.lower()}") for pt, cfg in PLAN_CONFIGS.items()
+)
+
 def get_plan_config(plan_type: PlanType) -> Dict[str, Any]:
     """Get plan configuration"""
     return PLAN_CONFIGS.get(plan_type, {})
@@ -81,9 +91,9 @@ def get_all_plans() -> Dict[PlanType, Dict[str, Any]]:
     """Get all plan configurations"""
     return PLAN_CONFIGS
 
+# Plain dict lookup, so invalid input costs no ValueError/traceback
+_PLAN_TYPE_BY_STR: Dict[str, PlanType] = {pt.value: pt for pt in PlanType}
+
 def validate_plan_type(plan_type_str: str) -> Optional[PlanType]:
     """Validate and return PlanType from string"""
-    try:
-        return PlanType(plan_type_str.upper())
-    except ValueError:
-        return None
\ No newline at end of file
+    return _PLAN_TYPE_BY_STR.get(plan_type_str.upper())
\ No newline at end of file
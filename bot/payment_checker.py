@@ -1,15 +1,65 @@
-import os
+import asyncio
 import logging
-from datetime import datetime, timedelta
+from datetime import timedelta
+from typing import Any, Dict, Optional
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
-from bot.models import PlanType, get_plan_configs
-from bot.btc_api import check_address_balance
-from bot.utils import format_btc_amount
+from bot.models import PLAN_CFG_BY_STR
+from bot.btc_api import check_address_balance, check_addresses_bulk, invalidate_balance
+from bot.utils import format_btc_amount, utc_now, ttl_cached, invalidate_cached
 from bot.core.config import Config
 import database
 
 logger = logging.getLogger(__name__)
 
+# Concurrent user notifications, kept under Telegram's ~30 messages/second limit
+NOTIFY_CONCURRENCY = 25
+
+# Message skeletons, filled with str.format per notification
+_CONFIRM_TMPL = (
+    "✅ Payment Confirmed!\n\n"
+    "Welcome to {emoji} {name}!\n\n"
+    "💰 Amount: {amount} BTC\n"
+    "{expires_line}\n"
+    "{vip_line}"
+    "\n🎉 Welcome to the community!"
+)
+_PARTIAL_TMPL = (
+    "⚠️ *Partial Payment Detected*\n\n"
+    "We received: {received} BTC\n"
+    "Expected: {expected} BTC\n"
+    "Missing: {missing} BTC\n\n"
+    "Please send the remaining amount to complete your payment.\n"
+    "Address: `{address}`"
+)
+_DOUBLE_SPEND_TMPL = (
+    "🚨 *DOUBLE SPEND ALERT*\n\n"
+    "Transaction ID: {tx_id}\n"
+    "User ID: {user_id}\n"
+    "Address: `{address}`\n"
+    "Amount: {amount} BTC\n"
+    "Plan: {plan}\n\n"
+    "⚠️ Potential double spending detected. Manual review required."
+)
+
+_REMINDER_TMPL = (
+    "🔔 **Important Reminder**\n\n"
+    "Your {name} payment was confirmed 40 minutes ago.\n\n"
+    "⚠️ **Please do not send any additional payments** for this plan to avoid double spending.\n\n"
+    "Your subscription is already active!"
+)
+
+# The confirmation keyboard never changes
+CONFIRMED_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("🔐 Request Admin Access", callback_data="admin_access")],
+    [InlineKeyboardButton("💼 Dashboard", callback_data="dashboard")]
+])
+
+# Workers confirming pending payments in parallel during one check_payments_job run
+PAYMENT_CHECK_WORKERS = 16
+
+# Aggregate stats are reused for this many seconds
+STATS_CACHE_TTL = 60
+
 async def check_payments_job(bot):
     """Check all pending payments"""
     logger.info("Checking payments...")
@@ -17,18 +67,32 @@ async def check_payments_job(bot):
     try:
         pending_txs = await database.get_pending_transactions()
 
+        # Look up every pending address in one concurrent burst
+        balances = await check_addresses_bulk([tx['btc_address'] for tx in pending_txs])
+
+        # A fixed worker pool drains the queue, so load stays bounded however many are pending
+        queue: asyncio.Queue = asyncio.Queue()
         for tx in pending_txs:
-            await check_single_payment(bot, tx)
+            queue.put_nowait(tx)
+
+        async def worker():
+            while not queue.empty():
+                tx = queue.get_nowait()
+                await check_single_payment(bot, tx, balances.get(tx['btc_address']))
 
-        await handle_expired_transactions(bot)
+        await asyncio.gather(*(worker() for _ in range(min(PAYMENT_CHECK_WORKERS, len(pending_txs)))))
+
+        # Expired pending addresses were just looked up; hand the balances on
+        await handle_expired_transactions(bot, balances)
 
     except Exception as e:
         logger.error(f"Error in payment check: {e}")
 
-async def check_single_payment(bot, tx):
-    """Check a single payment"""
+async def check_single_payment(bot, tx, balance: Optional[float] = None):
+    """Check a single payment, using balance when it was already fetched"""
     try:
-        balance = await check_address_balance(tx['btc_address'])
+        if balance is None:
+            balance = await check_address_balance(tx['btc_address'])
         expected_amount = float(tx['btc_amount'])
 
         if balance >= expected_amount:
@@ -52,14 +116,12 @@ async def check_single_payment(bot, tx):
 async def notify_partial_payment(bot, tx, received_amount: float, expected_amount: float):
     """Notify user about partial payment"""
     try:
-        difference = expected_amount - received_amount
-
-        partial_text = f"⚠️ *Partial Payment Detected*\n\n"
-        partial_text += f"We received: {format_btc_amount(received_amount)} BTC\n"
-        partial_text += f"Expected: {format_btc_amount(expected_amount)} BTC\n"
-        partial_text += f"Missing: {format_btc_amount(difference)} BTC\n\n"
-        partial_text += f"Please send the remaining amount to complete your payment.\n"
-        partial_text += f"Address: `{tx['btc_address']}`"
+        partial_text = _PARTIAL_TMPL.format(
+            received=format_btc_amount(received_amount),
+            expected=format_btc_amount(expected_amount),
+            missing=format_btc_amount(expected_amount - received_amount),
+            address=tx['btc_address']
+        )
 
         await bot.send_message(
             chat_id=tx['user_id'],
@@ -73,18 +135,16 @@ async def notify_partial_payment(bot, tx, received_amount: float, expected_amoun
 async def notify_admin_double_spend(bot, tx):
     """Notify admin about potential double spend"""
     try:
-        admin_id = int(os.getenv("ADMIN_USER_ID", 0))
-
-        alert_text = f"🚨 *DOUBLE SPEND ALERT*\n\n"
-        alert_text += f"Transaction ID: {tx['id']}\n"
-        alert_text += f"User ID: {tx['user_id']}\n"
-        alert_text += f"Address: `{tx['btc_address']}`\n"
-        alert_text += f"Amount: {format_btc_amount(float(tx['btc_amount']))} BTC\n"
-        alert_text += f"Plan: {tx['plan_type']}\n\n"
-        alert_text += f"⚠️ Potential double spending detected. Manual review required."
+        alert_text = _DOUBLE_SPEND_TMPL.format(
+            tx_id=tx['id'],
+            user_id=tx['user_id'],
+            address=tx['btc_address'],
+            amount=format_btc_amount(float(tx['btc_amount'])),
+            plan=tx['plan_type']
+        )
 
         await bot.send_message(
-            chat_id=admin_id,
+            chat_id=Config.ADMIN_USER_ID,
             text=alert_text,
             parse_mode='Markdown'
         )
@@ -95,33 +155,29 @@ async def notify_admin_double_spend(bot, tx):
 async def notify_admin_unpaid_users(bot):
     """Notify admin about users who started but haven't paid"""
     try:
-        admin_id = int(os.getenv("ADMIN_USER_ID", 0))
-
-        # Get users who started but haven't paid within 10 minutes
+        # Users who started 10-15 minutes ago (one 5-minute alert interval) and
+        # have no confirmed transaction; a range on idx_users_created_at plus
+        # an anti-join probing idx_transactions_user_status
         async with database.pool.acquire() as conn:
-            unpaid_users = await conn.fetch("""
-                SELECT u.user_id, u.first_name, u.username, u.created_at
-                FROM users u
-                LEFT JOIN transactions t ON u.user_id = t.user_id
-                WHERE u.created_at >= CURRENT_TIMESTAMP - INTERVAL '10 minutes'
-                AND u.created_at <= CURRENT_TIMESTAMP - INTERVAL '10 minutes'
-                AND (t.id IS NULL OR t.status = 'pending')
-                ORDER BY u.created_at DESC
-                LIMIT 5
-            """)
+            stmt = await conn.prepared('unpaid_users')
+            unpaid_users = await stmt.fetch()
 
         if unpaid_users:
-            alert_text = f"⏰ *Unpaid Users Alert*\n\n"
-            alert_text += f"Users who started 10 minutes ago but haven't paid:\n\n"
+            parts = [
+                "⏰ *Unpaid Users Alert*\n\n",
+                "Users who started 10 minutes ago but haven't paid:\n\n"
+            ]
 
             for user in unpaid_users:
-                alert_text += f"• {user['first_name']} (@{user['username'] or 'no_username'})\n"
-                alert_text += f"  ID: {user['user_id']}\n"
-                alert_text += f"  Started: {user['created_at'].strftime('%H:%M')}\n\n"
+                parts.append(
+                    f"• {user['first_name']} (@{user['username'] or 'no_username'})\n"
+                    f"  ID: {user['user_id']}\n"
+                    f"  Started: {user['created_at'].strftime('%H:%M')}\n\n"
+                )
 
             await bot.send_message(
-                chat_id=admin_id,
-                text=alert_text,
+                chat_id=Config.ADMIN_USER_ID,
+                text="".join(parts),
                 parse_mode='Markdown'
             )
 
@@ -131,125 +187,114 @@ async def notify_admin_unpaid_users(bot):
 async def confirm_payment(bot, tx):
     """Confirm payment and create subscription"""
     try:
-        # Update transaction
-        await database.update_transaction_status(tx['id'], 'confirmed', datetime.utcnow())
+        # One timestamp for the confirmation, the subscription and the message
+        now = utc_now()
 
-        # Create subscription
         plan_type = tx['plan_type']
         expires_at = None
 
-        plan_configs = get_plan_configs() # Use the dynamic function
-        if plan_configs[PlanType(plan_type)]["duration_days"]:
-            expires_at = datetime.utcnow() + timedelta(days=plan_configs[PlanType(plan_type)]["duration_days"])
+        plan_config = PLAN_CFG_BY_STR[plan_type]
+        if plan_config["duration_days"]:
+            expires_at = now + timedelta(days=plan_config["duration_days"])
 
-        await database.create_subscription(tx['user_id'], plan_type, tx['id'], expires_at)
+        # Confirm and create the subscription atomically; the guarded UPDATE skips
+        # transactions an admin approved or rejected since the pending list was read
+        async with database.transaction() as conn:
+            if not await database.approve_pending_transaction(tx['id'], now, conn=conn):
+                logger.info(f"Transaction {tx['id']} is no longer pending, skipping confirmation")
+                return
+            await database.create_subscription(tx['user_id'], plan_type, tx['id'], expires_at, conn=conn)
+        # Only after the commit, so no reader re-caches the old totals
+        invalidate_cached(*database.CONFIRMATION_CACHE_KEYS)
+        invalidate_balance(tx['btc_address'])
 
         # Get VIP link for this specific plan only
         vip_link = Config.VIP_LINKS.get(plan_type, "")
-        plan_config = plan_configs[PlanType(plan_type)] # Use the dynamic function
 
-        confirmation_text = f"✅ Payment Confirmed!\n\n"
-        confirmation_text += f"Welcome to {plan_config['emoji']} {plan_config['name']}!\n\n"
-        confirmation_text += f"💰 Amount: {format_btc_amount(float(tx['btc_amount']))} BTC\n"
-
-        if plan_config["duration_days"]:
-            expires_date = datetime.utcnow() + timedelta(days=plan_config["duration_days"])
-            confirmation_text += f"⏰ Expires: {expires_date.strftime('%Y-%m-%d')}\n"
-        else:
-            confirmation_text += f"⏰ Duration: Lifetime\n"
-
-        if vip_link:
-            confirmation_text += f"\n🔗 Your VIP Access:\n{vip_link}\n"
-
-        confirmation_text += f"\n🎉 Welcome to the community!"
-
-        keyboard = [
-            [InlineKeyboardButton("🔐 Request Admin Access", callback_data="admin_access")],
-            [InlineKeyboardButton("💼 Dashboard", callback_data="dashboard")]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        confirmation_text = _CONFIRM_TMPL.format(
+            emoji=plan_config['emoji'],
+            name=plan_config['name'],
+            amount=format_btc_amount(float(tx['btc_amount'])),
+            expires_line=f"⏰ Expires: {expires_at:%Y-%m-%d}" if expires_at else "⏰ Duration: Lifetime",
+            vip_line=f"\n🔗 Your VIP Access:\n{vip_link}\n" if vip_link else ""
+        )
 
         await bot.send_message(
             chat_id=tx['user_id'],
             text=confirmation_text,
-            reply_markup=reply_markup,
+            reply_markup=CONFIRMED_MARKUP,
             parse_mode='Markdown'
         )
 
     except Exception as e:
         logger.error(f"Error confirming payment {tx['id']}: {e}")
 
-async def send_double_spend_reminder(bot, user_id, plan_type):
+async def send_double_spend_reminder(bot, user_id, plan_config: Dict[str, Any]):
     """Send reminder 40 minutes after confirmation to avoid double spending"""
     try:
-        plan_configs = get_plan_configs()
-        plan_config = plan_configs[PlanType(plan_type)]
-        
-        reminder_text = f"🔔 **Important Reminder**\n\n"
-        reminder_text += f"Your {plan_config['name']} payment was confirmed 40 minutes ago.\n\n"
-        reminder_text += f"⚠️ **Please do not send any additional payments** for this plan to avoid double spending.\n\n"
-        reminder_text += f"Your subscription is already active!"
+        reminder_text = _REMINDER_TMPL.format(name=plan_config['name'])
         
         await bot.send_message(chat_id=user_id, text=reminder_text, parse_mode='Markdown')
         
     except Exception as e:
         logger.error(f"Failed to send double spend reminder to {user_id}: {e}")
 
+async def _plan_popularity_text() -> str:
+    """Build the plan popularity report"""
+    async with database.pool.acquire() as conn:
+        # Totals and shares come back ready to render from one window query
+        stmt = await conn.prepared('plan_popularity')
+        stats = await stmt.fetch()
+        
+    # No confirmed transactions means no groups at all
+    if not stats:
+        return "No confirmed transactions yet."
+    
+    plan_configs = PLAN_CFG_BY_STR
+    parts = ["📊 **Plan Popularity Stats:**\n\n"]
+    for row in stats:
+        plan_config = plan_configs[row['plan_type']]
+        parts.append(f"{plan_config['name']}: {row['count']} ({row['pct']:.1f}%)\n")
+    
+    parts.append(f"\nTotal: {stats[0]['total']} confirmed transactions")
+    return "".join(parts)
+
 async def get_plan_popularity_stats():
     """Get plan popularity statistics"""
     try:
-        async with database.pool.acquire() as conn:
-            stats = await conn.fetch("""
-                SELECT plan_type, COUNT(*) as count
-                FROM transactions 
-                WHERE status = 'confirmed'
-                GROUP BY plan_type
-            """)
-            
-            total = sum(row['count'] for row in stats)
-            if total == 0:
-                return "No confirmed transactions yet."
-            
-            plan_configs = get_plan_configs()
-            stats_text = f"📊 **Plan Popularity Stats:**\n\n"
-            for row in stats:
-                percentage = (row['count'] / total) * 100
-                plan_config = plan_configs[PlanType(row['plan_type'])]
-                stats_text += f"{plan_config['name']}: {row['count']} ({percentage:.1f}%)\n"
-            
-            stats_text += f"\nTotal: {total} confirmed transactions"
-            return stats_text
-            
+        return await ttl_cached('plan_popularity', STATS_CACHE_TTL, _plan_popularity_text)
     except Exception as e:
         logger.error(f"Error getting plan stats: {e}")
         return "Error retrieving statistics."
 
+# Heatmap bars are capped at this many blocks; every bar width is prebuilt
+HEATMAP_BAR_MAX = 20
+_BARS = tuple("█" * n for n in range(HEATMAP_BAR_MAX + 1))
+
+async def _activity_heatmap_text() -> str:
+    """Build the hourly activity heatmap"""
+    async with database.pool.acquire() as conn:
+        # The range predicate is served from idx_users_last_activity alone;
+        # the hour is derived only for the rows inside the window
+        stmt = await conn.prepared('activity_heatmap')
+        activity = await stmt.fetch()
+        
+    if not activity:
+        return "No recent user activity data."
+    
+    parts = ["🕐 **User Activity Heatmap (Last 7 Days):**\n\n"]
+    
+    # Create simple bar chart with activity by hour
+    for row in activity:
+        count = row['count']
+        parts.append(f"{row['hour']:02d}:00 {_BARS[min(count, HEATMAP_BAR_MAX)]} {count}\n")
+    
+    return "".join(parts)
+
 async def get_user_activity_heatmap():
     """Get user activity heatmap by hour"""
     try:
-        async with database.pool.acquire() as conn:
-            activity = await conn.fetch("""
-                SELECT EXTRACT(hour FROM last_activity) as hour, COUNT(*) as count
-                FROM users
-                WHERE last_activity >= CURRENT_TIMESTAMP - INTERVAL '7 days'
-                GROUP BY EXTRACT(hour FROM last_activity)
-                ORDER BY hour
-            """)
-            
-            if not activity:
-                return "No recent user activity data."
-            
-            heatmap_text = f"🕐 **User Activity Heatmap (Last 7 Days):**\n\n"
-            
-            # Create simple bar chart with activity by hour
-            for row in activity:
-                hour = int(row['hour'])
-                count = row['count']
-                bar = "█" * min(count, 20)  # Max 20 chars for bar
-                heatmap_text += f"{hour:02d}:00 {bar} {count}\n"
-            
-            return heatmap_text
-            
+        return await ttl_cached('activity_heatmap', STATS_CACHE_TTL, _activity_heatmap_text)
     except Exception as e:
         logger.error(f"Error getting activity heatmap: {e}")
         return "Error retrieving activity data."
@@ -261,55 +306,75 @@ async def run_all_alert_checks(bot):
     
     # Check for double spend reminders (40 minutes after confirmation)
     try:
-        forty_minutes_ago = datetime.utcnow() - timedelta(minutes=40)
-        five_minutes_window = datetime.utcnow() - timedelta(minutes=35)
+        now = utc_now()
+        forty_minutes_ago = now - timedelta(minutes=40)
+        five_minutes_window = now - timedelta(minutes=35)
         
+        # Claim due reminders in one statement so a transaction is never reminded
+        # twice; idx_transactions_reminder_due only holds unreminded confirmations
         async with database.pool.acquire() as conn:
-            reminder_txs = await conn.fetch("""
-                SELECT user_id, plan_type FROM transactions
-                WHERE status = 'confirmed' 
-                AND confirmed_at BETWEEN $1 AND $2
-            """, forty_minutes_ago, five_minutes_window)
+            stmt = await conn.prepared('claim_reminders')
+            reminder_txs = await stmt.fetch(forty_minutes_ago, five_minutes_window, now)
         
-        for tx in reminder_txs:
-            await send_double_spend_reminder(bot, tx['user_id'], tx['plan_type'])
+        semaphore = asyncio.Semaphore(NOTIFY_CONCURRENCY)
+        plan_configs = PLAN_CFG_BY_STR
+
+        async def remind(tx):
+            async with semaphore:
+                await send_double_spend_reminder(bot, tx['user_id'], plan_configs[tx['plan_type']])
+
+        # send_double_spend_reminder logs its own failures
+        await asyncio.gather(*(remind(tx) for tx in reminder_txs))
             
     except Exception as e:
         logger.error(f"Error sending double spend reminders: {e}")
 
-async def handle_expired_transactions(bot):
-    """Handle expired transactions"""
+async def handle_expired_transactions(bot, balances: Optional[Dict[str, float]] = None):
+    """Handle expired transactions, reusing already fetched balances where given"""
     try:
-        # Get expired transactions
+        # Get expired transactions: a range scan on idx_transactions_pending_cover,
+        # pulling only the columns used below
         async with database.pool.acquire() as conn:
-            expired_txs = await conn.fetch(
-                "SELECT * FROM transactions WHERE status = 'pending' AND expires_at <= CURRENT_TIMESTAMP"
-            )
-
-        for tx in expired_txs:
-            try:
-                # Check if address has balance
-                balance = await check_address_balance(tx['btc_address'])
+            stmt = await conn.prepared('expired_pending')
+            expired_txs = await stmt.fetch()
+
+        if not expired_txs:
+            return
+
+        # Addresses still holding funds stay assigned so they are never reused
+        balances = dict(balances or {})
+        missing = [tx['btc_address'] for tx in expired_txs if tx['btc_address'] not in balances]
+        if missing:
+            balances.update(await check_addresses_bulk(missing))
+        empty_addresses = [tx['btc_address'] for tx in expired_txs if balances[tx['btc_address']] == 0]
+
+        # Flip every status and free the empty addresses in one round trip
+        expired_txs = await database.expire_transactions(
+            [tx['id'] for tx in expired_txs], empty_addresses
+        )
+        for address in empty_addresses:
+            invalidate_balance(address)
 
-                if balance == 0:
-                    await database.release_btc_address(tx['btc_address'])
+        semaphore = asyncio.Semaphore(NOTIFY_CONCURRENCY)
 
-                await database.update_transaction_status(tx['id'], 'expired')
+        async def notify(tx):
+            async with semaphore:
+                try:
+                    expiry_text = f"⏰ *Payment Expired*\n\n"
+                    expiry_text += f"Your payment for {PLAN_CFG_BY_STR[tx['plan_type']]['name']} has expired.\n"
+                    expiry_text += f"Please start again with /start"
 
-                # Notify user
-                expiry_text = f"⏰ *Payment Expired*\n\n"
-                plan_configs = get_plan_configs() # Use the dynamic function
-                expiry_text += f"Your payment for {plan_configs[PlanType(tx['plan_type'])]['name']} has expired.\n"
-                expiry_text += f"Please start again with /start"
+                    await bot.send_message(
+                        chat_id=tx['user_id'],
+                        text=expiry_text,
+                        parse_mode='Markdown'
+                    )
 
-                await bot.send_message(
-                    chat_id=tx['user_id'],
-                    text=expiry_text,
-                    parse_mode='Markdown'
-                )
+                except Exception as e:
+                    logger.error(f"Error handling expired transaction {tx['id']}: {e}")
 
-            except Exception as e:
-                logger.error(f"Error handling expired transaction {tx['id']}: {e}")
+        # Each user is notified independently; failures are logged per tx
+        await asyncio.gather(*(notify(tx) for tx in expired_txs))
 
     except Exception as e:
         logger.error(f"Error handling expired transactions: {e}")
\ No newline at end of file
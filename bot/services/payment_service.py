@@ -1,9 +1,11 @@
 
 import logging
-from datetime import datetime, timedelta
+from datetime import timedelta
 from typing import Optional
-from bot.models import PlanType, get_plan_configs
+from bot.models import PlanType, PLAN_CONFIGS, PLAN_CFG_BY_STR
 from bot.core.config import Config
+from bot.btc_api import invalidate_balance
+from bot.utils import utc_now, invalidate_cached
 import database
 
 logger = logging.getLogger(__name__)
@@ -15,26 +17,29 @@ class PaymentService:
     async def create_payment(user_id: int, plan_type: PlanType, btc_price: float) -> Optional[dict]:
         """Create a new payment transaction"""
         try:
-            # Check for existing active subscription
-            active_sub = await database.get_active_subscription(user_id)
-            if active_sub:
-                return None
-                
-            # Get BTC address
-            btc_address = await database.get_next_btc_address(user_id)
-            if not btc_address:
-                return None
-                
-            # Calculate amounts
-            plan_config = get_plan_configs()[plan_type]
-            usd_amount = plan_config["price_usd"]
-            btc_amount = usd_amount / btc_price
-            
-            # Create transaction
-            expires_at = datetime.utcnow() + timedelta(minutes=Config.PAYMENT_TIMEOUT_MINUTES)
-            tx_id = await database.create_transaction(
-                user_id, plan_type.value, btc_address, btc_amount, usd_amount, btc_price, expires_at
-            )
+            # One connection for the whole purchase; a failure un-claims the address
+            async with database.transaction() as conn:
+                # Check for existing active subscription
+                active_sub = await database.get_active_subscription(user_id, conn=conn)
+                if active_sub:
+                    return None
+
+                # Get BTC address
+                btc_address = await database.get_next_btc_address(user_id, conn=conn)
+                if not btc_address:
+                    return None
+
+                # Calculate amounts
+                plan_config = PLAN_CONFIGS[plan_type]
+                usd_amount = plan_config["price_usd"]
+                btc_amount = usd_amount / btc_price
+
+                # Create transaction
+                expires_at = utc_now() + timedelta(minutes=Config.PAYMENT_TIMEOUT_MINUTES)
+                tx_id = await database.create_transaction(
+                    user_id, plan_type.value, btc_address, btc_amount, usd_amount, btc_price, expires_at,
+                    conn=conn
+                )
             
             return {
                 "id": tx_id,
@@ -54,23 +59,30 @@ class PaymentService:
     async def confirm_payment(transaction: dict) -> bool:
         """Confirm a payment and create subscription"""
         try:
-            # Update transaction status
-            await database.update_transaction_status(transaction['id'], 'confirmed', datetime.utcnow())
+            now = utc_now()
             
-            # Create subscription
             plan_type = transaction['plan_type']
             expires_at = None
-            
-            plan_config = get_plan_configs()[PlanType(plan_type)]
+
+            plan_config = PLAN_CFG_BY_STR[plan_type]
             if plan_config["duration_days"]:
-                expires_at = datetime.utcnow() + timedelta(days=plan_config["duration_days"])
-            
-            await database.create_subscription(
-                transaction['user_id'], 
-                plan_type, 
-                transaction['id'], 
-                expires_at
-            )
+                expires_at = now + timedelta(days=plan_config["duration_days"])
+
+            # Confirmation and subscription commit together on one connection,
+            # and only for a transaction that is still pending
+            async with database.transaction() as conn:
+                if not await database.approve_pending_transaction(transaction['id'], now, conn=conn):
+                    return False
+                await database.create_subscription(
+                    transaction['user_id'],
+                    plan_type,
+                    transaction['id'],
+                    expires_at,
+                    conn=conn
+                )
+            # Only after the commit, so no reader re-caches the old totals
+            invalidate_cached(*database.CONFIRMATION_CACHE_KEYS)
+            invalidate_balance(transaction['btc_address'])
             
             return True
             
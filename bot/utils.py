@@ -1,41 +1,71 @@
 
 import re
-from datetime import timedelta
-from typing import Optional
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+__all__ = [
+    "format_btc_amount",
+    "format_time_remaining",
+    "format_username",
+    "escape_md",
+    "validate_btc_address",
+    "format_currency",
+    "truncate_address",
+    "calculate_percentage",
+    "utc_now",
+    "ttl_cached",
+    "invalidate_cached",
+]
+
+# Formatters for amounts below 0.001, below 1, and 1 BTC or more
+_BTC_FORMATS = ("{:.8f}".format, "{:.6f}".format, "{:.4f}".format)
+
+def utc_now() -> datetime:
+    """Current UTC time as a naive datetime, matching the TIMESTAMP columns"""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
 
 def format_btc_amount(amount: float) -> str:
     """Format BTC amount with proper precision"""
-    if amount >= 1:
-        return f"{amount:.6f}"
-    elif amount >= 0.001:
-        return f"{amount:.8f}"
-    else:
-        return f"{amount:.10f}"
+    return _BTC_FORMATS[(amount >= 0.001) + (amount >= 1)](amount)
+
+_NO_TIME = timedelta(0)
 
 def format_time_remaining(time_left: timedelta) -> str:
     """Format time remaining in human readable format"""
-    if time_left.total_seconds() <= 0:
+    if time_left <= _NO_TIME:
         return "Expired"
     
-    total_seconds = int(time_left.total_seconds())
-    minutes, seconds = divmod(total_seconds, 60)
+    # Whole seconds straight from the timedelta fields, no float round-trip
+    hours, remainder = divmod(time_left.days * 86400 + time_left.seconds, 3600)
+    minutes, seconds = divmod(remainder, 60)
     
-    if minutes > 0:
-        return f"{minutes}m {seconds}s"
-    else:
-        return f"{seconds}s"
+    if hours:
+        return f"{hours}h {minutes}m {seconds}s"
+    return f"{minutes}m {seconds}s" if minutes else f"{seconds}s"
 
 def format_username(username: Optional[str]) -> str:
-    """Format username with @ prefix or return 'N/A'"""
-    if username:
-        return f"@{username}" if not username.startswith('@') else username
-    return "N/A"
+    """Format username for display"""
+    if not username:
+        return "no_username"
+    return f"@{username}"
+
+# Characters that open an entity in Telegram's legacy Markdown
+_MD_TABLE = str.maketrans({c: "\\" + c for c in "_*`["})
+
+def escape_md(text: str) -> str:
+    """Escape user-supplied text for a Markdown message"""
+    return text.translate(_MD_TABLE)
+
+# Basic regex for BTC addresses (simplified), compiled once
+_BTC_ADDRESS_RE = re.compile(r'^[13][a-km-zA-HJ-NP-Z1-9]{25,34}$|^bc1[a-z0-9]{39,59}$')
 
 def validate_btc_address(address: str) -> bool:
     """Basic BTC address validation"""
-    # Basic regex for BTC addresses (simplified)
-    btc_pattern = r'^[13][a-km-zA-HJ-NP-Z1-9]{25,34}$|^bc1[a-z0-9]{39,59}$'
-    return bool(re.match(btc_pattern, address))
+    # Anything outside the shortest legacy / longest bech32 length cannot match
+    if not 26 <= len(address) <= 62:
+        return False
+    return _BTC_ADDRESS_RE.match(address) is not None
 
 def format_currency(amount: float, currency: str = "USD") -> str:
     """Format currency with proper formatting"""
@@ -57,45 +87,22 @@ def calculate_percentage(part: float, total: float) -> float:
     if total == 0:
         return 0.0
     return (part / total) * 100
-def format_time_remaining(time_delta):
-    """Format time remaining in a readable format"""
-    total_seconds = int(time_delta.total_seconds())
-    
-    if total_seconds <= 0:
-        return "Expired"
-    
-    hours = total_seconds // 3600
-    minutes = (total_seconds % 3600) // 60
-    seconds = total_seconds % 60
-    
-    if hours > 0:
-        return f"{hours}h {minutes}m {seconds}s"
-    elif minutes > 0:
-        return f"{minutes}m {seconds}s"
-    else:
-        return f"{seconds}s"
-
-def format_btc_amount(amount):
-    """Format BTC amount with appropriate precision"""
-    if amount >= 1:
-        return f"{amount:.4f}"
-    elif amount >= 0.001:
-        return f"{amount:.6f}"
-    else:
-        return f"{amount:.8f}"
 
-def format_currency(amount):
-    """Format currency amount"""
-    return f"${amount:,.2f}"
+# Process-wide cache for slow reads: key -> (stored at, value)
+_ttl_cache: Dict[str, Tuple[float, Any]] = {}
 
-def format_username(username):
-    """Format username for display"""
-    if not username:
-        return "no_username"
-    return f"@{username}"
+async def ttl_cached(key: str, ttl: float, fetch: Callable[[], Awaitable[Any]]) -> Any:
+    """Return the cached result for key, running fetch() when older than ttl seconds; ttl <= 0 forces a refresh"""
+    now = time.monotonic()
+    entry = _ttl_cache.get(key)
+    if entry and ttl > 0 and now - entry[0] < ttl:
+        return entry[1]
 
-def calculate_percentage(part, total):
-    """Calculate percentage"""
-    if total == 0:
-        return 0
-    return (part / total) * 100
+    value = await fetch()
+    _ttl_cache[key] = (now, value)
+    return value
+
+def invalidate_cached(*keys: str):
+    """Drop cached results so the next read recomputes them"""
+    for key in keys:
+        _ttl_cache.pop(key, None)
@@ -5,31 +5,46 @@ import signal
 from datetime import timedelta
 from dotenv import load_dotenv
 
+try:
+    # Faster libuv-based event loop; the stdlib loop is used when it is unavailable
+    import uvloop
+except ImportError:
+    uvloop = None
+
 # Load environment variables
 load_dotenv()
 
 # Configure logging with security
 class SecureFormatter(logging.Formatter):
     """Custom formatter to mask sensitive information"""
+    # Read once; call set_token() if the token is swapped at runtime
+    _token = os.getenv("BOT_TOKEN", "")
+    _masked = f"{_token[:10]}***MASKED***"
+
+    @classmethod
+    def set_token(cls, token: str):
+        """Mask a new bot token from now on"""
+        cls._token = token or ""
+        cls._masked = f"{cls._token[:10]}***MASKED***"
+
     def format(self, record):
-        if hasattr(record, 'msg') and record.msg:
-            msg = str(record.msg)
-            bot_token = os.getenv("BOT_TOKEN", "")
-            if bot_token and bot_token in msg:
-                msg = msg.replace(bot_token, f"{bot_token[:10]}***MASKED***")
-            record.msg = msg
-        return super().format(record)
+        # Mask the rendered line, so tokens in args or non-str messages are covered too
+        formatted = super().format(record)
+        if self._token and self._token in formatted:
+            formatted = formatted.replace(self._token, self._masked)
+        return formatted
 
 def setup_logging():
     """Setup logging configuration"""
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.StreamHandler(),
-            logging.FileHandler('bot.log')
-        ]
-    )
+    formatter = SecureFormatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    handlers = [
+        logging.StreamHandler(),
+        logging.FileHandler('bot.log')
+    ]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    logging.basicConfig(level=logging.INFO, handlers=handlers)
 
     # Reduce telegram library verbosity
     logging.getLogger('telegram').setLevel(logging.ERROR)
@@ -40,24 +55,27 @@ def setup_logging():
 
     # Filter out spam logs
     class CustomFilter(logging.Filter):
-        def filter(self, record):
-            message = record.getMessage().lower()
-
-            # Filter out telegram "not modified" errors
-            if "message is not modified" in message:
-                return False
-            if "specified new message content" in message:
-                return False
-            if "exactly the same as a current content" in message:
-                return False
+        # Telegram "not modified" errors are dropped at every level
+        _NOT_MODIFIED = (
+            "message is not modified",
+            "specified new message content",
+            "exactly the same as a current content",
+        )
+        # Connection noise is only dropped below these levels
+        _BELOW_ERROR = _NOT_MODIFIED + ("connection pool is closed",)
+        _BELOW_WARNING = _BELOW_ERROR + ("ssl",)
 
-            # Filter out connection noise
-            if "connection pool is closed" in message and record.levelno < logging.ERROR:
-                return False
-            if "ssl" in message and record.levelno < logging.WARNING:
-                return False
+        def filter(self, record):
+            levelno = record.levelno
+            if levelno >= logging.ERROR:
+                patterns = self._NOT_MODIFIED
+            elif levelno >= logging.WARNING:
+                patterns = self._BELOW_ERROR
+            else:
+                patterns = self._BELOW_WARNING
 
-            return True
+            message = record.getMessage().lower()
+            return not any(p in message for p in patterns)
 
     logging.getLogger().addFilter(CustomFilter())
 
@@ -72,6 +90,7 @@ try:
     from bot.handlers import handle_start, handle_callback
     from bot.admin import handle_admin
     from bot.payment_checker import check_payments_job
+    from bot.btc_api import close_btc_api
 except ImportError as e:
     logger.error(f"Import error: {e}")
     exit(1)
@@ -186,6 +205,8 @@ class TelegramBot:
             except:
                 pass
 
+        await close_btc_api()
+
 async def main():
     """Main entry point"""
     bot = TelegramBot()
@@ -197,4 +218,9 @@ async def main():
         logger.error(f"Fatal error: {e}")
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    if uvloop is not None:
+        # uvloop.run() replaces the install() + asyncio.run() pair, which is
+        # deprecated from Python 3.12
+        uvloop.run(main())
+    else:
+        asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+
+asyncpg = pytest.importorskip("asyncpg")
+from asyncpg.pool import PoolConnectionProxy
+
+import database
+
+
+class FakeConnection(database.PreparedConnection):
+    """PreparedConnection that prepares without a server"""
+    __slots__ = ()
+
+    async def prepare(self, query):
+        return query
+
+
+def _proxied_connection():
+    con = object.__new__(FakeConnection)
+    con._proxy = None
+    con._aborted = True  # nothing for Connection.__del__ to clean up
+    return con, PoolConnectionProxy(None, con)
+
+
+@pytest.fixture
+def schema_ready(monkeypatch):
+    monkeypatch.setattr(database, "_schema_ready", True)
+
+
+def test_setup_hook_warms_through_pool_proxy(schema_ready):
+    con, proxy = _proxied_connection()
+
+    asyncio.run(database._warm_primary(proxy))
+
+    assert con._warmed is True
+    assert con._prepared.keys() == database.PRIMARY_PREPARED
+
+
+def test_setup_hook_runs_once_per_connection(schema_ready, monkeypatch):
+    con, proxy = _proxied_connection()
+    asyncio.run(database._warm_primary(proxy))
+
+    async def fail(name):
+        raise AssertionError("warmed connection prepared again")
+    monkeypatch.setattr(FakeConnection, "prepared", fail)
+    asyncio.run(database._warm_primary(proxy))
+
+    assert con._prepared.keys() == database.PRIMARY_PREPARED
+
+
+def test_setup_hook_waits_for_schema():
+    con, proxy = _proxied_connection()
+
+    asyncio.run(database._warm_primary(proxy))
+
+    assert not hasattr(con, "_warmed")
+
+
+def test_analytics_hook_warms_only_analytics(schema_ready):
+    con, proxy = _proxied_connection()
+
+    asyncio.run(database._warm_analytics(proxy))
+
+    assert con._warmed is True
+    assert con._prepared.keys() == database.ANALYTICS_PREPARED
+
+
+def test_primary_connection_still_serves_analytics(schema_ready):
+    # The development fallback shares one pool: analytics are prepared on first use
+    con, proxy = _proxied_connection()
+    asyncio.run(database._warm_primary(proxy))
+
+    for name in database.ANALYTICS_PREPARED:
+        assert asyncio.run(proxy.prepared(name)) == database.PREPARED_SQL[name]